@@ -3,18 +3,28 @@ import logging
 import os
 import sys
 import time
+import json
 from botocore.exceptions import ClientError
+from metrics import evaluate_transform_output
 
 logger = logging.getLogger()
 logging_format = "%(levelname)s: [%(filename)s:%(lineno)s] %(message)s"
 logging.basicConfig(format=logging_format, level=os.environ.get("LOGLEVEL", "INFO").upper())
 codepipeline_client = boto3.client("codepipeline")
 sagemaker_client = boto3.client("sagemaker")
+s3_client = boto3.client("s3")
 image_uri = os.environ["IMAGE_URI"]
 bucket_name = os.environ["BUCKET_NAME"]
 role_arn = os.environ["ROLE_ARN"]
 pipeline_name = os.environ["PIPELINE_NAME"]
 model_name = os.environ["MODEL_NAME"]
+use_spot = os.environ.get("USE_SPOT_INSTANCES", "False").lower() == "true"
+evaluation_mode = os.environ.get("EVALUATION_MODE", "processing").lower()
+transform_instance_count = int(os.environ.get("TRANSFORM_INSTANCE_COUNT", 1))
+training_instance_count = int(os.environ.get("TRAINING_INSTANCE_COUNT", 1))
+processing_instance_count = int(os.environ.get("PROCESSING_INSTANCE_COUNT", 1))
+input_mode = os.environ.get("INPUT_MODE", "File")
+preprocessing_npy = os.environ.get("PREPROCESSING_NPY", "False")
 
 
 def get_execution_id(name=None, task=None):
@@ -47,7 +57,7 @@ def handle_data(model_name=None, execution_id=None):
             ProcessingJobName=f"{model_name}-ProcessingJob-{execution_id}",
             ProcessingResources={
                 'ClusterConfig': {
-                    'InstanceCount': 1,
+                    'InstanceCount': processing_instance_count,
                     'InstanceType': 'ml.m5.xlarge',
                     'VolumeSizeInGB': 30
                 }
@@ -66,8 +76,8 @@ def handle_data(model_name=None, execution_id=None):
                         'S3Uri': f"s3://{bucket_name}/data/{model_name}.data",
                         'LocalPath': '/opt/ml/processing/input/data',
                         'S3DataType': 'S3Prefix',
-                        'S3InputMode': 'File',
-                        'S3DataDistributionType': 'FullyReplicated',
+                        'S3InputMode': 'Pipe' if input_mode == 'Pipe' else 'File',
+                        'S3DataDistributionType': 'ShardedByS3Key' if processing_instance_count > 1 else 'FullyReplicated',
                         'S3CompressionType': 'None'
                     }
                 }
@@ -92,6 +102,9 @@ def handle_data(model_name=None, execution_id=None):
                     }
                 ]
             },
+            Environment={
+                'PREPROCESSING_NPY': preprocessing_npy
+            },
             RoleArn=role_arn
         )
         return f"{model_name}-ProcessingJob-{execution_id}"
@@ -102,12 +115,20 @@ def handle_data(model_name=None, execution_id=None):
 
 
 def handle_training(model_name=None, execution_id=None):
+    stopping_condition = {
+        'MaxRuntimeInSeconds': 3600
+    }
+    if use_spot:
+        stopping_condition['MaxWaitTimeInSeconds'] = 2 * stopping_condition['MaxRuntimeInSeconds']
+    channels = {'training': f"s3://{bucket_name}/{execution_id}/input/training"}
+    if input_mode == 'Pipe':
+        channels = {channel: f"s3://{bucket_name}/{execution_id}/input/training/{channel}" for channel in ['training', 'validation']}
     try:
         response = sagemaker_client.create_training_job(
             TrainingJobName=f"{model_name}-TrainingJob-{execution_id}",
             AlgorithmSpecification={
                 'TrainingImage': f"{image_uri}:latest",
-                'TrainingInputMode': 'File',
+                'TrainingInputMode': input_mode,
                 'EnableSageMakerMetricsTimeSeries': True,
                 'MetricDefinitions': [
                     {
@@ -134,29 +155,32 @@ def handle_training(model_name=None, execution_id=None):
             },
             InputDataConfig=[
                 {
-                    'ChannelName': 'training',
+                    'ChannelName': channel,
                     'ContentType': 'text/csv',
                     'DataSource': {
                         'S3DataSource': {
-                            'S3Uri': f"s3://{bucket_name}/{execution_id}/input/training",
+                            'S3Uri': uri,
                             'S3DataType': 'S3Prefix',
                             'S3DataDistributionType': 'FullyReplicated'
                         }
                     }
-                }
+                } for channel, uri in channels.items()
             ],
             OutputDataConfig={
                 'S3OutputPath': f"s3://{bucket_name}/{execution_id}"
             },
             ResourceConfig={
                 'InstanceType': 'ml.m5.xlarge',
-                'InstanceCount': 1,
+                'InstanceCount': training_instance_count,
                 'VolumeSizeInGB': 30
             },
             RoleArn=role_arn,
-            StoppingCondition={
-                'MaxRuntimeInSeconds': 3600
-            }
+            EnableManagedSpotTraining=use_spot,
+            CheckpointConfig={
+                'S3Uri': f"s3://{bucket_name}/{execution_id}/checkpoints",
+                'LocalPath': '/opt/ml/checkpoints'
+            },
+            StoppingCondition=stopping_condition
         )
         return f"{model_name}-TrainingJob-{execution_id}"
     except ClientError as e:
@@ -228,6 +252,92 @@ def handle_evaluation(model_name=None, execution_id=None):
         raise Exception(error)
 
 
+def handle_transform(model_name=None, execution_id=None):
+    try:
+        sagemaker_client.create_model(
+            ModelName=f"{model_name}-EvaluationModel-{execution_id}",
+            PrimaryContainer={
+                'Image': f"{image_uri}:latest",
+                'ModelDataUrl': get_model_artifact(name=f"{model_name}-TrainingJob-{execution_id}")
+            },
+            ExecutionRoleArn=role_arn
+        )
+        response = sagemaker_client.create_transform_job(
+            TransformJobName=f"{model_name}-TransformJob-{execution_id}",
+            ModelName=f"{model_name}-EvaluationModel-{execution_id}",
+            BatchStrategy='MultiRecord',
+            MaxPayloadInMB=6,
+            MaxConcurrentTransforms=4,
+            TransformInput={
+                'DataSource': {
+                    'S3DataSource': {
+                        'S3DataType': 'S3Prefix',
+                        'S3Uri': f"s3://{bucket_name}/{execution_id}/input/testing"
+                    }
+                },
+                'ContentType': 'text/csv',
+                'CompressionType': 'None',
+                'SplitType': 'Line'
+            },
+            TransformOutput={
+                'S3OutputPath': f"s3://{bucket_name}/{execution_id}/transform",
+                'Accept': 'text/csv',
+                'AssembleWith': 'Line'
+            },
+            TransformResources={
+                'InstanceType': 'ml.m5.xlarge',
+                'InstanceCount': transform_instance_count
+            },
+            DataProcessing={
+                'InputFilter': '$[1:]',
+                'JoinSource': 'Input',
+                'OutputFilter': '$'
+            }
+        )
+        return f"{model_name}-TransformJob-{execution_id}"
+    except ClientError as e:
+        error = e.response["Error"]["Message"]
+        logger.error(error)
+        raise Exception(error)
+
+
+def report_transform(model_name=None, execution_id=None, status=None):
+    try:
+        if status == "Completed":
+            report = evaluate_transform_output(s3_client, f"s3://{bucket_name}/{execution_id}/transform").report()
+            logger.info(f"Task: evaluate, Evaluation Report: {report}")
+            s3_client.put_object(
+                Bucket=bucket_name,
+                Key=f"{execution_id}/evaluation/evaluation.json",
+                Body=json.dumps(report).encode("utf-8")
+            )
+    except ClientError as e:
+        error = e.response["Error"]["Message"]
+        logger.error(error)
+        raise Exception(error)
+    finally:
+        delete_model(name=f"{model_name}-EvaluationModel-{execution_id}")
+
+
+def delete_model(name=None):
+    try:
+        sagemaker_client.delete_model(ModelName=name)
+        logger.info(f"Task: evaluate, Deleted Model: {name}")
+    except ClientError as e:
+        logger.error(f"Task: evaluate, Failed to delete Model {name}: {e.response['Error']['Message']}")
+
+
+def report_training(job_name=None):
+    response = sagemaker_client.describe_training_job(TrainingJobName=job_name)
+    wait_time = (response["TrainingStartTime"] - response["CreationTime"]).total_seconds()
+    training_time = response.get("TrainingTimeInSeconds", 0)
+    billable_time = response.get("BillableTimeInSeconds", training_time)
+    savings = (1 - billable_time / training_time) * 100 if training_time else 0
+    logger.info(f"Task: train, Spot Training: {response.get('EnableManagedSpotTraining', False)}")
+    logger.info(f"Task: train, Wait Time: {wait_time:.0f}s, Training Time: {training_time}s, Billable Time: {billable_time}s")
+    logger.info(f"Task: train, Managed Spot Training Savings: {savings:.1f}%")
+
+
 def handle_status(task=None, job_name=None):
     if task == "preprocess" or task == "evaluate":
         status = sagemaker_client.describe_processing_job(ProcessingJobName=job_name)["ProcessingJobStatus"]
@@ -236,12 +346,21 @@ def handle_status(task=None, job_name=None):
             logger.info(f"Task: {task},  Status: {status}")
             status = sagemaker_client.describe_processing_job(ProcessingJobName=job_name)["ProcessingJobStatus"]
         return status
+    elif task == "transform":
+        status = sagemaker_client.describe_transform_job(TransformJobName=job_name)["TransformJobStatus"]
+        while status == "InProgress":
+            time.sleep(60)
+            logger.info(f"Task: {task}, Status: {status}")
+            status = sagemaker_client.describe_transform_job(TransformJobName=job_name)["TransformJobStatus"]
+        return status
     elif task == "train":
         status = sagemaker_client.describe_training_job(TrainingJobName=job_name)["TrainingJobStatus"]
         while status == "InProgress":
             time.sleep(60)
             logger.info(f"Task: {task}, Status: {status}")
             status = sagemaker_client.describe_training_job(TrainingJobName=job_name)["TrainingJobStatus"]
+        if status == "Completed":
+            report_training(job_name=job_name)
         return status
 
 
@@ -255,6 +374,10 @@ if __name__ == "__main__":
     elif task == "train":
         job_name = handle_training(model_name=model_name, execution_id=execution_id)
         status = handle_status(task=task, job_name=job_name)
+    elif task == "evaluate" and evaluation_mode == "transform":
+        job_name = handle_transform(model_name=model_name, execution_id=execution_id)
+        status = handle_status(task="transform", job_name=job_name)
+        report_transform(model_name=model_name, execution_id=execution_id, status=status)
     elif task == "evaluate":
         job_name = handle_evaluation(model_name=model_name, execution_id=execution_id)
         status = handle_status(task=task, job_name=job_name)
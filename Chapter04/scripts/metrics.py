@@ -0,0 +1,110 @@
+import argparse
+import json
+import math
+import os
+from urllib.parse import urlparse
+
+
+class RegressionMetrics(object):
+    def __init__(self):
+        self.count = 0
+        self.squared_error = 0.0
+        self.mean_error = 0.0
+        self.error_variance = 0.0
+
+    def update(self, truth, prediction):
+        error = truth - prediction
+        self.count += 1
+        delta = error - self.mean_error
+        self.mean_error += delta / self.count
+        self.error_variance += delta * (error - self.mean_error)
+        self.squared_error += error * error
+
+    def report(self):
+        if self.count == 0:
+            raise ValueError("No predictions found in the transform output!")
+        mse = self.squared_error / self.count
+        std = math.sqrt(self.error_variance / self.count)
+        return {
+            "regression_metrics": {
+                "rmse": {
+                    "value": math.sqrt(mse),
+                    "standard_deviation": std
+                },
+                "mse": {
+                    "value": mse,
+                    "standard_deviation": std
+                },
+            },
+        }
+
+
+def parse_line(line, label_index=0):
+    if isinstance(line, bytes):
+        line = line.decode("utf-8")
+    line = line.strip()
+    if len(line) == 0:
+        return None
+    fields = line.split(",")
+    return float(fields[label_index]), float(fields[-1])
+
+
+def evaluate_lines(lines, metrics=None, baseline=None):
+    metrics = metrics or RegressionMetrics()
+    for line in lines:
+        row = parse_line(line)
+        if row is None:
+            continue
+        truth, prediction = row
+        metrics.update(truth, prediction)
+        if baseline is not None:
+            baseline.write(f"{prediction},{truth}\n")
+    return metrics
+
+
+def list_shards(s3, uri):
+    bucket = urlparse(uri).netloc
+    prefix = urlparse(uri).path.lstrip("/")
+    shards = []
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        shards += [(bucket, obj["Key"]) for obj in page.get("Contents", []) if obj["Key"].endswith(".out")]
+    return sorted(shards)
+
+
+def evaluate_transform_output(s3, uri, baseline=None):
+    metrics = RegressionMetrics()
+    if baseline is not None:
+        baseline.write("prediction,label\n")
+    shards = list_shards(s3, uri)
+    for index, (bucket, key) in enumerate(shards):
+        print(f"Reading transform output shard {index + 1}/{len(shards)}: s3://{bucket}/{key}")
+        body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+        evaluate_lines(body.iter_lines(), metrics, baseline)
+    return metrics
+
+
+def evaluate_files(paths, baseline=None):
+    metrics = RegressionMetrics()
+    if baseline is not None:
+        baseline.write("prediction,label\n")
+    for path in paths:
+        with open(path, "rb") as f:
+            evaluate_lines(f, metrics, baseline)
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output", type=str, help="Local transform output directory or file")
+    parser.add_argument("--baseline", type=str, default=None)
+    args = parser.parse_args()
+    if os.path.isdir(args.output):
+        paths = sorted(os.path.join(args.output, name) for name in os.listdir(args.output) if name.endswith(".out"))
+    else:
+        paths = [args.output]
+    if args.baseline is None:
+        metrics = evaluate_files(paths)
+    else:
+        with open(args.baseline, "w") as f:
+            metrics = evaluate_files(paths, f)
+    print(json.dumps(metrics.report()))
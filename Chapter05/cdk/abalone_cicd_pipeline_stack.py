@@ -11,7 +11,7 @@ import aws_cdk.aws_s3_deployment as s3_deployment
 from constructs import Construct
 
 class PipelineStack(cdk.Stack):
-    def __init__(self, scope: Construct, id: str, *, model_name: str=None, repo_name: str=None, cdk_version: str=None, **kwargs) -> None:
+    def __init__(self, scope: Construct, id: str, *, model_name: str=None, repo_name: str=None, cdk_version: str=None, evaluation_mode: str="processing", transform_instance_count: int=1, training_instance_count: int=1, processing_instance_count: int=1, input_mode: str="File", preprocessing_npy: bool=False, use_spot: bool=False, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
         
         sagemaker_role = iam.Role(
@@ -170,6 +170,15 @@ class PipelineStack(cdk.Stack):
                 ),
                 "MODEL_NAME": codebuild.BuildEnvironmentVariable(
                     value=model_name
+                ),
+                "PREPROCESSING_NPY": codebuild.BuildEnvironmentVariable(
+                    value=str(preprocessing_npy)
+                ),
+                "PROCESSING_INSTANCE_COUNT": codebuild.BuildEnvironmentVariable(
+                    value=str(processing_instance_count)
+                ),
+                "INPUT_MODE": codebuild.BuildEnvironmentVariable(
+                    value=input_mode
                 )
             },
             build_spec=codebuild.BuildSpec.from_object(
@@ -221,6 +230,7 @@ class PipelineStack(cdk.Stack):
             environment=codebuild.BuildEnvironment(
                 build_image=codebuild.LinuxBuildImage.STANDARD_5_0
             ),
+            timeout=cdk.Duration.minutes(180 if use_spot else 60),
             environment_variables={
                 "IMAGE_URI": codebuild.BuildEnvironmentVariable(
                     value=container_repo.repository_uri
@@ -236,6 +246,15 @@ class PipelineStack(cdk.Stack):
                 ),
                 "MODEL_NAME": codebuild.BuildEnvironmentVariable(
                     value=model_name
+                ),
+                "USE_SPOT_INSTANCES": codebuild.BuildEnvironmentVariable(
+                    value=str(use_spot)
+                ),
+                "TRAINING_INSTANCE_COUNT": codebuild.BuildEnvironmentVariable(
+                    value=str(training_instance_count)
+                ),
+                "INPUT_MODE": codebuild.BuildEnvironmentVariable(
+                    value=input_mode
                 )
             },
             build_spec=codebuild.BuildSpec.from_object(
@@ -302,6 +321,12 @@ class PipelineStack(cdk.Stack):
                 ),
                 "MODEL_NAME": codebuild.BuildEnvironmentVariable(
                     value=model_name
+                ),
+                "EVALUATION_MODE": codebuild.BuildEnvironmentVariable(
+                    value=evaluation_mode
+                ),
+                "TRANSFORM_INSTANCE_COUNT": codebuild.BuildEnvironmentVariable(
+                    value=str(transform_instance_count)
                 )
             },
             build_spec=codebuild.BuildSpec.from_object(
@@ -337,6 +362,10 @@ class PipelineStack(cdk.Stack):
                     "sagemaker:DescribeTrainingJob",
                     "sagemaker:DescribeProcessingJob",
                     "sagemaker:CreateProcessingJob",
+                    "sagemaker:CreateModel",
+                    "sagemaker:DeleteModel",
+                    "sagemaker:CreateTransformJob",
+                    "sagemaker:DescribeTransformJob",
                     "codepipeline:GetPipelineState"
                 ],
                 effect=iam.Effect.ALLOW,
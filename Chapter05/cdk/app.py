@@ -9,6 +9,16 @@ from abalone_cicd_pipeline.abalone_cicd_pipeline_stack import PipelineStack
 MODEL = "abalone"
 CODECOMMIT_REPOSITORY = "abalone-cicd-pipeline"
 CDK_VERSION = "2.3.0"
+EVALUATION_MODE = "processing"
+# EVALUATION_MODE = "transform"
+TRANSFORM_INSTANCE_COUNT = 1
+TRAINING_INSTANCE_COUNT = 1
+PROCESSING_INSTANCE_COUNT = 1
+INPUT_MODE = "File"
+# INPUT_MODE = "FastFile"
+# INPUT_MODE = "Pipe"
+PREPROCESSING_NPY = False
+USE_SPOT = False
 
 app = cdk.App()
 
@@ -25,7 +35,14 @@ PipelineStack(
     env=cdk.Environment(account=os.getenv("CDK_DEFAULT_ACCOUNT"), region=os.getenv("CDK_DEFAULT_REGION")),
     model_name=MODEL,
     repo_name=CODECOMMIT_REPOSITORY,
-    cdk_version=CDK_VERSION
+    cdk_version=CDK_VERSION,
+    evaluation_mode=EVALUATION_MODE,
+    transform_instance_count=TRANSFORM_INSTANCE_COUNT,
+    training_instance_count=TRAINING_INSTANCE_COUNT,
+    processing_instance_count=PROCESSING_INSTANCE_COUNT,
+    input_mode=INPUT_MODE,
+    preprocessing_npy=PREPROCESSING_NPY,
+    use_spot=USE_SPOT
 )
 
 app.synth()
\ No newline at end of file
@@ -1,30 +1,95 @@
+import argparse
+import io
 import json
+import multiprocessing
 import os
-import tarfile
+import time
+import numpy as np
 import pandas as pd
-import tensorflow as tf
 from sklearn import preprocessing
+from inference import extract_artifacts
+
+inference_engine = os.environ.get("INFERENCE_ENGINE", "keras")
+evaluation_workers = int(os.environ.get("EVALUATION_WORKERS", 1))
+progress_interval = int(os.environ.get("PROGRESS_INTERVAL", 1000))
+batch_size = int(os.environ.get("EVALUATION_BATCH_SIZE", 1024))
+column_names = ["rings", "sex", "length", "diameter", "height", "whole_weight", "shucked_weight", "viscera_weight", "shell_weight"]
+worker_model = None
+
+
 def load_model(model_path):
-    model = tf.keras.models.load_model(os.path.join(model_path, "model.h5"))
-    model.compile(optimizer="adam", loss="mse")
+    started = time.time()
+    if inference_engine == "numpy":
+        from inference import NumpyModel
+        model = NumpyModel.load(model_path)
+    else:
+        import tensorflow as tf
+        model = tf.keras.models.load_model(model_path, compile=False)
+    print(f"Model Load Time: {time.time() - started:.3f}s", flush=True)
     return model
 
-def evaluate_model(prefix, model):
-    column_names = ["rings", "sex", "length", "diameter", "height", "whole_weight", "shucked_weight", "viscera_weight", "shell_weight"]
-    input_path = os.path.join(prefix, "processing/testing")
-    output_path = os.path.join(prefix, "processing/evaluation")
-    predictions = []
-    truths = []
-    test_df = pd.read_csv(os.path.join(input_path, "testing.csv"), names=column_names)
+
+def init_worker(model_path):
+    global worker_model
+    worker_model = load_model(model_path)
+
+
+def shard_ranges(path, shards):
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, "rb") as f:
+        for shard in range(1, shards):
+            position = max(size * shard // shards, offsets[-1])
+            if position > 0:
+                f.seek(position - 1)
+                f.readline()
+                position = min(f.tell(), size)
+            offsets.append(position)
+    offsets.append(size)
+    return [(start, end) for start, end in zip(offsets[:-1], offsets[1:]) if end > start]
+
+
+def score_shard(shard):
+    index, path, start, end = shard
+    with open(path, "rb") as f:
+        f.seek(start)
+        test_df = pd.read_csv(io.BytesIO(f.read(end - start)), names=column_names)
     y = test_df["rings"].to_numpy()
     X = test_df.drop(["rings"], axis=1).to_numpy()
     X = preprocessing.normalize(X)
-    for row in range(len(X)):
-        payload = [X[row].tolist()]
-        result = model.predict(payload)
-        print(result[0][0])
-        predictions.append(float(result[0][0]))
-        truths.append(float(y[row]))
+    predict = worker_model.predict if inference_engine == "numpy" else worker_model.predict_on_batch
+    predictions = []
+    for row in range(0, len(X), batch_size):
+        predictions += np.asarray(predict(X[row:row + batch_size])).reshape(-1).tolist()
+        if row // progress_interval != (row + batch_size) // progress_interval:
+            print(f"Shard {index}: scored {min(row + batch_size, len(X))}/{len(X)} rows", flush=True)
+    return y.astype(float).tolist(), [float(prediction) for prediction in predictions]
+
+
+def score_model(prefix, model_path, workers):
+    testing_path = os.path.join(prefix, "processing/testing/testing.csv")
+    shards = [(index, testing_path, start, end) for index, (start, end) in enumerate(shard_ranges(testing_path, workers))]
+    print(f"Scoring {len(shards)} shard(s) of {testing_path} with {workers} worker(s)")
+    started = time.time()
+    if workers == 1:
+        init_worker(model_path)
+        results = [score_shard(shard) for shard in shards]
+    else:
+        with multiprocessing.get_context("spawn").Pool(workers, initializer=init_worker, initargs=(model_path,)) as pool:
+            results = pool.map(score_shard, shards, chunksize=1)
+    predictions = []
+    truths = []
+    for shard_truths, shard_predictions in results:
+        truths += shard_truths
+        predictions += shard_predictions
+    elapsed = time.time() - started
+    print(f"Scored {len(truths)} rows in {elapsed:.1f}s ({len(truths) / max(elapsed, 1e-9):.0f} rows/sec)")
+    return truths, predictions, elapsed
+
+
+def evaluate_model(prefix, model_path, workers=evaluation_workers):
+    output_path = os.path.join(prefix, "processing/evaluation")
+    truths, predictions, _ = score_model(prefix, model_path, workers)
     report = {
             "GroundTruth": truths,
             "Predictions": predictions
@@ -33,15 +98,31 @@ def evaluate_model(prefix, model):
         f.write(json.dumps(report))
 
 
+def benchmark_model(prefix, model_path, workers=evaluation_workers):
+    serial_truths, serial_predictions, serial_elapsed = score_model(prefix, model_path, 1)
+    truths, predictions, elapsed = score_model(prefix, model_path, workers)
+    if truths != serial_truths or not np.allclose(predictions, serial_predictions, rtol=1e-5, atol=1e-5):
+        raise Exception(f"Results from {workers} worker(s) do not match the serial evaluation")
+    print(f"Parity check passed for {len(truths)} rows, max abs difference: {np.max(np.abs(np.subtract(predictions, serial_predictions)), initial=0):.2e}")
+    print(f"Serial: {serial_elapsed:.1f}s, {workers} worker(s): {elapsed:.1f}s ({serial_elapsed / max(elapsed, 1e-9):.1f}x speedup)")
+
+
 if __name__ == "__main__":
-    print("Extracting model archive")
-    prefix = "/opt/ml"
-    model_path = os.path.join(prefix, "model")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prefix", type=str, default="/opt/ml")
+    parser.add_argument("--workers", type=int, default=evaluation_workers)
+    parser.add_argument("--benchmark", action="store_true")
+    args, _ = parser.parse_known_args()
+    prefix = args.prefix
+    model_path = os.path.join(prefix, "model/model.h5")
     tarfile_path = os.path.join(prefix, "processing/model/model.tar.gz")
-    with tarfile.open(tarfile_path) as tar:
-        tar.extractall(path=model_path)
-    print("Loading Trained Model")
-    model = load_model(model_path)
-    print("Evaluating Trained Model")
-    evaluate_model(prefix, model)
-    print("Done!")
\ No newline at end of file
+    if os.path.exists(tarfile_path):
+        print("Extracting model artifacts")
+        model_path = extract_artifacts(tarfile_path, ["model.h5"])["model.h5"]
+    if args.benchmark:
+        print("Benchmarking Trained Model")
+        benchmark_model(prefix, model_path, max(args.workers, 1))
+    else:
+        print("Evaluating Trained Model")
+        evaluate_model(prefix, model_path, max(args.workers, 1))
+    print("Done!")
@@ -16,20 +16,16 @@ from airflow.providers.amazon.aws.operators.glue_crawler import AwsGlueCrawlerOp
 from airflow.providers.amazon.aws.hooks.lambda_function import AwsLambdaHook
 from airflow.operators.python_operator import BranchPythonOperator
 from airflow.operators.dummy import DummyOperator
+from dag_config import DagConfig
+from sagemaker_operators import SageMakerJobOperator
 
-sagemaker_seesion = sagemaker.Session()
-region_name = sagemaker_seesion.boto_region_name
+region_name = boto3.session.Session().region_name
 model_name = "abalone"
 data_prefix = "abalone_data"
-data_bucket = f"""{boto3.client("ssm", region_name=region_name).get_parameter(Name="AirflowDataBucket")["Parameter"]["Value"]}"""
-glue_job_name = f"""{boto3.client("ssm", region_name=region_name).get_parameter(Name="GlueJob")["Parameter"]["Value"]}"""
-crawler_name = f"""{boto3.client("ssm", region_name=region_name).get_parameter(Name="GlueCrawler")["Parameter"]["Value"]}"""
-sagemaker_role = f"""{boto3.client("ssm", region_name=region_name).get_parameter(Name="SageMakerRoleARN")["Parameter"]["Value"]}"""
-lambda_function = f"""{boto3.client("ssm", region_name=region_name).get_parameter(Name="AnalyzeResultsLambda")["Parameter"]["Value"]}"""
+config = DagConfig(["AirflowDataBucket", "GlueJob", "GlueCrawler", "SageMakerRoleARN", "AnalyzeResultsLambda"], region_name=region_name)
 container_image = f"763104351884.dkr.ecr.{region_name}.amazonaws.com/tensorflow-training:2.5.0-cpu-py37-ubuntu18.04-v1.0"
-training_input = f"s3://{data_bucket}/{data_prefix}/training"
-testing_input = f"s3://{data_bucket}/{data_prefix}/testing"
-data_capture = f"s3://{data_bucket}/endpoint-data-capture"
+training_input = f"s3://{config.template('AirflowDataBucket')}/{data_prefix}/training"
+testing_input = f"s3://{config.template('AirflowDataBucket')}/{data_prefix}/testing"
 default_args = {
     "owner": "airflow",
     "depends_on_past": False,
@@ -39,29 +35,44 @@ default_args = {
 }
 
 
-def training(data, **kwargs):
+class GlueJobOperator(AwsGlueJobOperator):
+    template_fields = tuple(AwsGlueJobOperator.template_fields) + ("job_name",)
+
+
+class GlueCrawlerOperator(AwsGlueCrawlerOperator):
+    template_fields = tuple(AwsGlueCrawlerOperator.template_fields) + ("config",)
+
+
+def training(data, instance_count=1, quantization="none", **kwargs):
     estimator = TensorFlow(
         base_job_name=model_name,
         entry_point="/usr/local/airflow/dags/model/model_training.py",
-        role=sagemaker_role,
+        role=config.get("SageMakerRoleARN"),
         framework_version="2.4",
         py_version="py37",
-        hyperparameters={"epochs": 200, "batch-size": 8},
+        hyperparameters={"epochs": 200, "batch-size": 8, "quantization": quantization},
         script_mode=True,
-        instance_count=1,
+        instance_count=int(instance_count),
         instance_type="ml.m5.xlarge",
     )
-    estimator.fit(data)
+    estimator.fit(data, wait=False)
+    return str(estimator.latest_training_job.name)
+
+
+def training_complete(event, **kwargs):
     kwargs["ti"].xcom_push(
         key="TrainingJobName",
-        value=str(estimator.latest_training_job.name)
+        value=event["job_name"]
+    )
+    kwargs["ti"].xcom_push(
+        key="TrainingJobMetadata",
+        value=dict(event["metadata"], TrainingJobName=event["job_name"])
     )
 
 
 def evaluation(ds, **kwargs):
-    training_job_name = kwargs["ti"].xcom_pull(key="TrainingJobName")
-    estimator = TensorFlow.attach(training_job_name)
-    model_data = estimator.model_data,
+    data_bucket = config.get("AirflowDataBucket")
+    training_job = kwargs["ti"].xcom_pull(key="TrainingJobMetadata")
     processor = Processor(
         base_job_name=f"{model_name}-evaluation",
         image_uri=container_image,
@@ -71,23 +82,24 @@ def evaluation(ds, **kwargs):
         ],
         instance_count=1,
         instance_type="ml.m5.xlarge",
-        role=sagemaker_role,
-        max_runtime_in_seconds=1200
+        role=config.get("SageMakerRoleARN"),
+        max_runtime_in_seconds=1200,
+        env={"INFERENCE_ENGINE": "numpy"}
     )
     processor.run(
         inputs=[
             ProcessingInput(
-                source=testing_input,
+                source=f"s3://{data_bucket}/{data_prefix}/testing",
                 destination="/opt/ml/processing/testing",
                 input_name="input"
             ),
             ProcessingInput(
-                source=model_data[0],
+                source=training_job["ModelArtifacts"],
                 destination="/opt/ml/processing/model",
                 input_name="model"
             ),
             ProcessingInput(
-                source="s3://{}/airflow/scripts/evaluate.py".format(data_bucket),
+                source="s3://{}/airflow/scripts/".format(data_bucket),
                 destination="/opt/ml/processing/input/code",
                 input_name="code"
             )
@@ -98,16 +110,18 @@ def evaluation(ds, **kwargs):
                 destination="s3://{}/{}/evaluation".format(data_bucket, data_prefix),
                 output_name="evaluation"
             )
-        ]
+        ],
+        wait=False,
+        logs=False
     )
+    return processor.latest_job.job_name
 
 
 def deploy_model(ds, **kwargs):
-    training_job_name = kwargs["ti"].xcom_pull(key="TrainingJobName")
-    estimator = TensorFlow.attach(training_job_name)
+    training_job = kwargs["ti"].xcom_pull(key="TrainingJobMetadata")
     model = Model(
-        model_data=estimator.model_data,
-        role=sagemaker_role,
+        model_data=training_job["ModelArtifacts"],
+        role=config.get("SageMakerRoleARN"),
         framework_version="2.4",
         sagemaker_session=sagemaker.Session()
     )
@@ -117,14 +131,14 @@ def deploy_model(ds, **kwargs):
         data_capture_config=DataCaptureConfig(
             enable_capture=True,
             sampling_percentage=100,
-            destination_s3_uri=data_capture
+            destination_s3_uri=f"s3://{config.get('AirflowDataBucket')}/endpoint-data-capture"
         )
     )
 
 
 def get_results(ds, **kwargs):
     hook = AwsLambdaHook(
-        function_name=lambda_function,
+        function_name=config.get("AnalyzeResultsLambda"),
         aws_conn_id="aws_default",
         invocation_type="RequestResponse",
         log_type="None",
@@ -134,7 +148,7 @@ def get_results(ds, **kwargs):
     request = hook.invoke_lambda(
         payload=json.dumps(
             {
-                "Bucket": data_bucket,
+                "Bucket": config.get("AirflowDataBucket"),
                 "Key": f"{data_prefix}/evaluation/evaluation.json"
             }
         )
@@ -160,30 +174,39 @@ with DAG(
     schedule_interval="@daily",
     concurrency=1,
     max_active_runs=1,
+    params={"training_instance_count": 1, "quantization": "none"},
+    user_defined_macros=config.macros(),
 ) as dag:
     
-    crawler_task = AwsGlueCrawlerOperator(
+    crawler_task = GlueCrawlerOperator(
         task_id="crawl_data",
-        config={"Name": crawler_name}
+        config={"Name": config.template("GlueCrawler")}
     )
 
-    etl_task = AwsGlueJobOperator(
+    etl_task = GlueJobOperator(
         task_id="preprocess_data",
-        job_name=glue_job_name
+        job_name=config.template("GlueJob")
     )
 
-    training_task = PythonOperator(
+    training_task = SageMakerJobOperator(
         task_id="training",
-        python_callable=training,
-        op_args=[training_input],
-        provide_context=True,
+        job_type="training",
+        submit_callable=training,
+        complete_callable=training_complete,
+        op_args=[{"training": training_input, "testing": testing_input}],
+        op_kwargs={
+            "instance_count": "{{ (dag_run.conf or {}).get('training_instance_count', params.training_instance_count) }}",
+            "quantization": "{{ (dag_run.conf or {}).get('quantization', params.quantization) }}"
+        },
+        region_name=region_name,
         dag=dag
     )
 
-    evaluation_task = PythonOperator(
+    evaluation_task = SageMakerJobOperator(
         task_id="evaluate_model",
-        python_callable=evaluation,
-        provide_context=True,
+        job_type="processing",
+        submit_callable=evaluation,
+        region_name=region_name,
         dag=dag
     )
 
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import boto3
+
+cache_ttl = int(os.environ.get("DAG_CONFIG_TTL", 300))
+cache_dir = os.environ.get("DAG_CONFIG_CACHE_DIR", tempfile.gettempdir())
+
+
+class DagConfig(object):
+    def __init__(self, names, region_name=None, ttl=cache_ttl, client=None):
+        self.names = sorted(set(names))
+        self.region_name = region_name
+        self.ttl = ttl
+        self.client = client
+        self.values = None
+        self.loaded = 0
+        key = hashlib.sha256(json.dumps([region_name] + self.names).encode("utf-8")).hexdigest()[:16]
+        self.cache_path = os.path.join(cache_dir, f"dag_config_{key}.json")
+
+    def read_cache(self):
+        if not os.path.exists(self.cache_path) or time.time() - os.path.getmtime(self.cache_path) >= self.ttl:
+            return None
+        with open(self.cache_path, "r") as f:
+            return json.load(f)
+
+    def write_cache(self, values):
+        temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(values, f)
+        os.replace(temp_path, self.cache_path)
+
+    def fetch(self):
+        client = self.client or boto3.client("ssm", region_name=self.region_name)
+        values = {}
+        for start in range(0, len(self.names), 10):
+            response = client.get_parameters(Names=self.names[start:start + 10])
+            if len(response["InvalidParameters"]) > 0:
+                raise KeyError(f"SSM parameters not found: {response['InvalidParameters']}")
+            values.update({parameter["Name"]: parameter["Value"] for parameter in response["Parameters"]})
+        return values
+
+    def load(self):
+        values = self.read_cache()
+        if values is None:
+            values = self.fetch()
+            self.write_cache(values)
+        self.values = values
+        self.loaded = time.time()
+        return values
+
+    def get(self, name):
+        if name not in self.names:
+            raise KeyError(f"'{name}' is not a declared DAG parameter!")
+        if self.values is None or time.time() - self.loaded >= self.ttl:
+            self.load()
+        return self.values[name]
+
+    def template(self, name):
+        return "{{ parameter('" + name + "') }}"
+
+    def macros(self):
+        return {"parameter": self.get}
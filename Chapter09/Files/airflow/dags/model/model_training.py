@@ -1,5 +1,9 @@
 import argparse
 import os
+import json
+import sys
+import shutil
+import tempfile
 import numpy as np
 import pandas as pd
 
@@ -12,6 +16,71 @@ from sklearn import preprocessing
 
 tf.get_logger().setLevel("ERROR")
 
+
+def get_cluster(port=2222):
+    hosts = json.loads(os.environ.get("SM_HOSTS", "[]"))
+    if "TF_CONFIG" not in os.environ and len(hosts) > 1:
+        os.environ["TF_CONFIG"] = json.dumps({
+            "cluster": {"worker": [f"{host}:{port}" for host in hosts]},
+            "task": {"type": "worker", "index": hosts.index(os.environ["SM_CURRENT_HOST"])}
+        })
+    if "TF_CONFIG" not in os.environ:
+        return 1, 0
+    config = json.loads(os.environ["TF_CONFIG"])
+    return len(config["cluster"]["worker"]), config["task"]["index"]
+
+
+def distributed_dataset(strategy, X, y, batch_size, shuffle):
+    def dataset_fn(input_context):
+        dataset = tf.data.Dataset.from_tensor_slices((X.astype(np.float32), y.astype(np.float32)))
+        dataset = dataset.shard(input_context.num_input_pipelines, input_context.input_pipeline_id)
+        if shuffle:
+            dataset = dataset.shuffle(len(X))
+        return dataset.repeat().batch(batch_size).prefetch(tf.data.experimental.AUTOTUNE)
+    return strategy.distribute_datasets_from_function(dataset_fn)
+
+
+def export_tflite(model, export_path, quantization, X):
+    print(f"Exporting TFLite model with '{quantization}' quantization")
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([X[i:i+1].astype(np.float32)] for i in range(min(len(X), 500)))
+    elif quantization != "none":
+        raise ValueError(f"Unsupported quantization: {quantization}")
+    with open(export_path, "wb") as f:
+        f.write(converter.convert())
+
+
+def tflite_predict(model_path, X):
+    interpreter = tf.lite.Interpreter(model_path=model_path)
+    input_index = interpreter.get_input_details()[0]["index"]
+    interpreter.resize_tensor_input(input_index, X.shape)
+    interpreter.allocate_tensors()
+    interpreter.set_tensor(input_index, X.astype(np.float32))
+    interpreter.invoke()
+    return interpreter.get_tensor(interpreter.get_output_details()[0]["index"])
+
+
+def save_parity_report(model, tflite_path, report_path, X, y, quantization):
+    keras_predictions = model.predict(X).flatten()
+    tflite_predictions = tflite_predict(tflite_path, X).flatten()
+    report = {
+        "quantization": quantization,
+        "rows": int(len(X)),
+        "max_abs_difference": float(np.max(np.abs(keras_predictions - tflite_predictions))),
+        "keras_rmse": float(np.sqrt(np.mean((keras_predictions - y) ** 2))),
+        "tflite_rmse": float(np.sqrt(np.mean((tflite_predictions - y) ** 2))),
+        "tflite_size_bytes": os.path.getsize(tflite_path)
+    }
+    print(f"TFLite Parity Report: {report}")
+    with open(report_path, "w") as f:
+        json.dump(report, f)
+
+
 if __name__ == "__main__":
     print(f"Tensorflow Version: {tf.__version__}")
     column_names = ["rings", "sex", "length", "diameter", "height", "whole_weight", "shucked_weight", "viscera_weight", "shell_weight"]
@@ -20,7 +89,15 @@ if __name__ == "__main__":
     parser.add_argument("--batch-size", type=int, default=8)
     parser.add_argument("--model-dir", type=str, default=os.environ["SM_MODEL_DIR"])
     parser.add_argument("--training", type=str, default=os.environ["SM_CHANNEL_TRAINING"])
+    parser.add_argument("--testing", type=str, default=os.environ.get("SM_CHANNEL_TESTING"))
+    parser.add_argument("--quantization", type=str, default="none", choices=["none", "float16", "int8"])
     args, _ = parser.parse_known_args()
+    num_workers, worker_index = get_cluster()
+    if num_workers > 1:
+        print(f"Multi-worker training: worker {worker_index} of {num_workers}")
+        strategy = tf.distribute.MultiWorkerMirroredStrategy()
+    else:
+        strategy = tf.distribute.get_strategy()
     epochs = args.epochs
     batch_size = args.batch_size
     training_path = args.training
@@ -33,24 +110,37 @@ if __name__ == "__main__":
     val_X = val_data.drop(["rings"], axis=1).to_numpy()
     train_X = preprocessing.normalize(train_X)
     val_X = preprocessing.normalize(val_X)
-    network_layers = [
-        Dense(64, activation="relu", kernel_initializer="normal", input_dim=8),
-        Dense(64, activation="relu"),
-        Dense(1, activation="linear")
-    ]
-    model = Sequential(network_layers)
-    model.compile(optimizer="adam", loss="mse", metrics=["mae", "accuracy"])
+    with strategy.scope():
+        network_layers = [
+            Dense(64, activation="relu", kernel_initializer="normal", input_dim=8),
+            Dense(64, activation="relu"),
+            Dense(1, activation="linear")
+        ]
+        model = Sequential(network_layers)
+        model.compile(optimizer="adam", loss="mse", metrics=["mae", "accuracy"])
     model.summary()
-    model.fit(
-        train_X,
-        train_y,
-        validation_data=(val_X, val_y),
-        batch_size=batch_size,
-        epochs=epochs,
-        shuffle=True,
-        verbose=1
-    )
+    if num_workers > 1:
+        model.fit(
+            distributed_dataset(strategy, train_X, train_y, batch_size, True),
+            validation_data=distributed_dataset(strategy, val_X, val_y, batch_size, False),
+            steps_per_epoch=max(len(train_X) // (batch_size * num_workers), 1),
+            validation_steps=max(len(val_X) // (batch_size * num_workers), 1),
+            epochs=epochs,
+            verbose=1
+        )
+    else:
+        model.fit(
+            train_X,
+            train_y,
+            validation_data=(val_X, val_y),
+            batch_size=batch_size,
+            epochs=epochs,
+            shuffle=True,
+            verbose=1
+        )
     
+    if worker_index > 0:
+        model_path = tempfile.mkdtemp()
     model.save(os.path.join(model_path, "model.h5"))
     model_version = 1
     export_path = os.path.join(model_path, str(model_version))
@@ -62,4 +152,22 @@ if __name__ == "__main__":
         save_format=None,
         signatures=None,
         options=None
-    )
\ No newline at end of file
+    )
+    if worker_index > 0:
+        shutil.rmtree(model_path)
+    else:
+        if num_workers > 1:
+            model = tf.keras.models.load_model(os.path.join(model_path, "model.h5"))
+        if args.quantization != "none":
+            try:
+                tflite_path = os.path.join(model_path, "model.tflite")
+                export_tflite(model, tflite_path, args.quantization, train_X)
+                if args.testing is not None:
+                    test_data = pd.read_csv(os.path.join(args.testing, "testing.csv"), sep=",", names=column_names)
+                    test_y = test_data["rings"].to_numpy()
+                    test_X = preprocessing.normalize(test_data.drop(["rings"], axis=1).to_numpy())
+                else:
+                    test_X, test_y = val_X, val_y
+                save_parity_report(model, tflite_path, os.path.join(model_path, "parity.json"), test_X, test_y, args.quantization)
+            except Exception as e:
+                print(f"Skipping the TFLite export: {e}", file=sys.stderr)
@@ -0,0 +1,35 @@
+import asyncio
+from airflow.exceptions import AirflowException
+from airflow.models import BaseOperator
+from sagemaker_triggers import SageMakerJobTrigger, deferrable, wait_for_event
+
+
+class SageMakerJobOperator(BaseOperator):
+    template_fields = ("op_args", "op_kwargs")
+
+    def __init__(self, *, job_type, submit_callable, complete_callable=None, op_args=None, op_kwargs=None, region_name=None, poll_interval=30, **kwargs):
+        super().__init__(**kwargs)
+        self.job_type = job_type
+        self.submit_callable = submit_callable
+        self.complete_callable = complete_callable
+        self.op_args = op_args or []
+        self.op_kwargs = op_kwargs or {}
+        self.region_name = region_name
+        self.poll_interval = poll_interval
+
+    def execute(self, context):
+        job_name = self.submit_callable(*self.op_args, **self.op_kwargs, **context)
+        self.log.info(f"Submitted SageMaker {self.job_type} job: {job_name}")
+        trigger = SageMakerJobTrigger(job_name, self.job_type, self.region_name, self.poll_interval)
+        if deferrable:
+            self.defer(trigger=trigger, method_name="execute_complete")
+        self.log.info("Deferrable operators need Airflow 2.2 or later, waiting in the worker instead")
+        return self.execute_complete(context, asyncio.run(wait_for_event(trigger)))
+
+    def execute_complete(self, context, event=None):
+        if event["status"] != "Completed":
+            raise AirflowException(f"SageMaker {event['job_type']} job {event['job_name']} {event['status']}: {event['message']}")
+        self.log.info(f"SageMaker {event['job_type']} job {event['job_name']} completed")
+        if self.complete_callable is not None:
+            return self.complete_callable(event, **context)
+        return event["job_name"]
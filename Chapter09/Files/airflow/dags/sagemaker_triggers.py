@@ -0,0 +1,93 @@
+import asyncio
+import functools
+import boto3
+
+try:
+    from airflow.triggers.base import BaseTrigger, TriggerEvent
+    deferrable = True
+except ImportError:
+    deferrable = False
+
+    class BaseTrigger(object):
+        def __init__(self, **kwargs):
+            pass
+
+    class TriggerEvent(object):
+        def __init__(self, payload):
+            self.payload = payload
+
+jobs = {
+    "training": ("describe_training_job", "TrainingJobName", "TrainingJobStatus"),
+    "processing": ("describe_processing_job", "ProcessingJobName", "ProcessingJobStatus")
+}
+terminal_states = ["Completed", "Failed", "Stopped"]
+
+
+def get_client(region_name=None):
+    return boto3.client("sagemaker", region_name=region_name)
+
+
+def timestamp(value):
+    return value.isoformat() if value is not None else None
+
+
+def job_metadata(job_type, response):
+    if job_type == "training":
+        return {
+            "ModelArtifacts": response.get("ModelArtifacts", {}).get("S3ModelArtifacts"),
+            "TrainingImage": response.get("AlgorithmSpecification", {}).get("TrainingImage"),
+            "Metrics": {metric["MetricName"]: metric["Value"] for metric in response.get("FinalMetricDataList", [])},
+            "TrainingStartTime": timestamp(response.get("TrainingStartTime")),
+            "TrainingEndTime": timestamp(response.get("TrainingEndTime")),
+            "TrainingTimeInSeconds": response.get("TrainingTimeInSeconds"),
+            "BillableTimeInSeconds": response.get("BillableTimeInSeconds")
+        }
+    return {
+        "ProcessingStartTime": timestamp(response.get("ProcessingStartTime")),
+        "ProcessingEndTime": timestamp(response.get("ProcessingEndTime"))
+    }
+
+
+class SageMakerJobTrigger(BaseTrigger):
+    def __init__(self, job_name, job_type, region_name=None, poll_interval=30):
+        super().__init__()
+        if job_type not in jobs:
+            raise ValueError(f"Unsupported SageMaker job type '{job_type}', expected one of {list(jobs)}")
+        self.job_name = job_name
+        self.job_type = job_type
+        self.region_name = region_name
+        self.poll_interval = poll_interval
+
+    def serialize(self):
+        return (
+            "sagemaker_triggers.SageMakerJobTrigger",
+            {
+                "job_name": self.job_name,
+                "job_type": self.job_type,
+                "region_name": self.region_name,
+                "poll_interval": self.poll_interval
+            }
+        )
+
+    async def run(self):
+        method, name_key, status_key = jobs[self.job_type]
+        describe = getattr(get_client(self.region_name), method)
+        loop = asyncio.get_event_loop()
+        while True:
+            response = await loop.run_in_executor(None, functools.partial(describe, **{name_key: self.job_name}))
+            status = response[status_key]
+            if status in terminal_states:
+                yield TriggerEvent({
+                    "job_name": self.job_name,
+                    "job_type": self.job_type,
+                    "status": status,
+                    "message": response.get("FailureReason", ""),
+                    "metadata": job_metadata(self.job_type, response)
+                })
+                return
+            await asyncio.sleep(self.poll_interval)
+
+
+async def wait_for_event(trigger):
+    async for event in trigger.run():
+        return event.payload
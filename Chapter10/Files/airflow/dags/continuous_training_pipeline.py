@@ -4,22 +4,23 @@ import sagemaker
 import boto3
 import numpy as np
 import pandas as pd
-from time import sleep
-from datetime import timedelta
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
 from sagemaker.feature_store.feature_group import FeatureGroup
+from features import schema, one_hot, one_hot_names
+from dag_config import DagConfig
+from s3_new_data import S3NewDataSensor, get_client, read_new_objects, mark_processed
 
 import airflow
 from airflow import DAG
 from airflow.operators.python_operator import PythonOperator
+from airflow.sensors.python import PythonSensor
 from airflow.providers.amazon.aws.hooks.lambda_function import AwsLambdaHook
-from airflow.providers.amazon.aws.sensors.s3_prefix import S3PrefixSensor
 
-sagemaker_session = sagemaker.Session()
-region_name = sagemaker_session.boto_region_name
+region_name = boto3.session.Session().region_name
 data_prefix = "abalone_data"
-data_bucket = f"""{boto3.client("ssm", region_name=region_name).get_parameter(Name="DataBucket")["Parameter"]["Value"]}"""
-lambda_function = f"""{boto3.client("ssm", region_name=region_name).get_parameter(Name="ReleaseChangeLambda")["Parameter"]["Value"]}"""
-fg_name = f"""{boto3.client("ssm", region_name=region_name).get_parameter(Name="FeatureGroup")["Parameter"]["Value"]}"""
+state_key = f"airflow_state/{data_prefix}.json"
+config = DagConfig(["DataBucket", "ReleaseChangeLambda", "FeatureGroup"], region_name=region_name)
 default_args = {
     "owner": "airflow",
     "depends_on_past": False,
@@ -31,7 +32,7 @@ default_args = {
 
 def start_pipeline():
     hook = AwsLambdaHook(
-        function_name=lambda_function,
+        function_name=config.get("ReleaseChangeLambda"),
         aws_conn_id="aws_default",
         invocation_type="RequestResponse",
         log_type="Tail",
@@ -43,16 +44,38 @@ def start_pipeline():
     print(f"Response: {response}")
 
 
-def update_feature_group():
-    fg = FeatureGroup(name=fg_name, sagemaker_session=sagemaker_session)
+def update_feature_group(**kwargs):
+    data_bucket = config.get("DataBucket")
+    new_objects = kwargs["ti"].xcom_pull(task_ids="s3_trigger", key="NewObjects")
+    client = get_client(region_name)
     column_names = ["sex", "length", "diameter", "height", "whole_weight", "shucked_weight", "viscera_weight", "shell_weight", "rings"]
-    abalone_data = pd.read_csv(f"s3://{data_bucket}/{data_prefix}/abalone.new", names=column_names)
-    data = abalone_data[["rings", "sex", "length", "diameter", "height", "whole_weight", "shucked_weight", "viscera_weight", "shell_weight"]]
-    processed_data = pd.get_dummies(data)
+    abalone_data, read_objects = read_new_objects(client, data_bucket, new_objects, names=column_names)
+    if abalone_data is None:
+        print("No new data left to ingest")
+        return
+    print(f"Ingesting {len(abalone_data)} rows from {[item['Key'] for item in read_objects]}")
+    fg = FeatureGroup(name=config.get("FeatureGroup"), sagemaker_session=sagemaker.Session())
+    processed_data = abalone_data[[schema["label"]] + schema["measurements"]].copy()
+    processed_data[one_hot_names()] = one_hot(abalone_data)[:, len(schema["measurements"]):].astype("uint8")
     time_stamp = int(round(time.time()))
     processed_data["TimeStamp"] = pd.Series([time_stamp] * len(processed_data), dtype="float64")
     fg.ingest(data_frame=processed_data, max_workers=5, wait=True)
-    sleep(300)
+    mark_processed(client, data_bucket, state_key, read_objects, new_objects)
+    return time_stamp
+
+
+def offline_store_ready(**kwargs):
+    time_stamp = kwargs["ti"].xcom_pull(task_ids="update_fg")
+    if time_stamp is None:
+        return True
+    uri = urlparse(boto3.client("sagemaker", region_name=region_name).describe_feature_group(
+        FeatureGroupName=config.get("FeatureGroup")
+    )["OfflineStoreConfig"]["S3StorageConfig"]["ResolvedOutputS3Uri"])
+    partition = datetime.utcfromtimestamp(time_stamp).strftime("year=%Y/month=%m/day=%d/hour=%H/")
+    for page in get_client(region_name).get_paginator("list_objects_v2").paginate(Bucket=uri.netloc, Prefix=f"{uri.path.strip('/')}/{partition}"):
+        if any(item["LastModified"].timestamp() >= time_stamp for item in page.get("Contents", [])):
+            return True
+    return False
 
 
 with DAG(
@@ -61,18 +84,35 @@ with DAG(
     schedule_interval="@daily",
     concurrency=1,
     max_active_runs=1,
+    user_defined_macros=config.macros(),
 ) as dag:
 
-    s3_trigger = S3PrefixSensor(  
+    s3_trigger = S3NewDataSensor(
         task_id="s3_trigger",
-        bucket_name=data_bucket,
-        prefix=data_prefix,
+        bucket_name=config.template("DataBucket"),
+        prefix=f"{data_prefix}/",
+        state_key=state_key,
+        watch_keys=[f"{data_prefix}/abalone.new"],
+        region_name=region_name,
+        poke_interval=300,
+        timeout=timedelta(hours=23).total_seconds(),
+        soft_fail=True,
         dag=dag
     )
     
     update_fg_task = PythonOperator(
         task_id="update_fg",
         python_callable=update_feature_group,
+        provide_context=True,
+        dag=dag
+    )
+    
+    offline_store_task = PythonSensor(
+        task_id="wait_for_offline_store",
+        python_callable=offline_store_ready,
+        mode="reschedule",
+        poke_interval=60,
+        timeout=timedelta(hours=1).total_seconds(),
         dag=dag
     )
     
@@ -82,4 +122,4 @@ with DAG(
         dag=dag
     )
     
-    s3_trigger >> update_fg_task >> trigger_release_task
\ No newline at end of file
+    s3_trigger >> update_fg_task >> offline_store_task >> trigger_release_task
\ No newline at end of file
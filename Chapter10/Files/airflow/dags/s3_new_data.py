@@ -0,0 +1,114 @@
+import json
+import logging
+import boto3
+import pandas as pd
+from botocore.exceptions import ClientError
+from airflow.sensors.base import BaseSensorOperator
+
+logger = logging.getLogger(__name__)
+
+
+def get_client(region_name=None):
+    return boto3.client("s3", region_name=region_name)
+
+
+def read_state(client, bucket, state_key):
+    try:
+        response = client.get_object(Bucket=bucket, Key=state_key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "NoSuchKey":
+            return {}
+        error_message = e.response["Error"]["Message"]
+        logger.error(error_message)
+        raise Exception(error_message)
+    return json.loads(response["Body"].read())
+
+
+def write_state(client, bucket, state_key, state):
+    client.put_object(Bucket=bucket, Key=state_key, Body=json.dumps(state, sort_keys=True).encode("utf-8"))
+
+
+def list_new_objects(client, bucket, prefix, state, watch_keys=()):
+    new_objects = []
+    listed = state.get("Listed", {})
+    start_after = {"StartAfter": state["StartAfter"]} if state.get("StartAfter") else {}
+    for page in client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix, **start_after):
+        for item in page.get("Contents", []):
+            if item["Key"].endswith("/") or item["Size"] == 0 or item["Key"] in watch_keys:
+                continue
+            if listed.get(item["Key"]) != item["ETag"]:
+                new_objects.append({"Key": item["Key"], "ETag": item["ETag"]})
+    for key in watch_keys:
+        try:
+            response = client.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ["404", "NoSuchKey", "NotFound"]:
+                continue
+            error_message = e.response["Error"]["Message"]
+            logger.error(error_message)
+            raise Exception(error_message)
+        if response["ContentLength"] > 0 and state.get("Watched", {}).get(key) != response["ETag"]:
+            new_objects.append({"Key": key, "ETag": response["ETag"], "Watched": True})
+    return new_objects
+
+
+def read_new_objects(client, bucket, new_objects, **kwargs):
+    frames = []
+    read_objects = []
+    for item in new_objects:
+        try:
+            response = client.get_object(Bucket=bucket, Key=item["Key"], IfMatch=item["ETag"])
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "PreconditionFailed":
+                error_message = e.response["Error"]["Message"]
+                logger.error(error_message)
+                raise Exception(error_message)
+            logger.warning(f"s3://{bucket}/{item['Key']} changed since it was detected, leaving it for the next run")
+            continue
+        frames.append(pd.read_csv(response["Body"], **kwargs))
+        read_objects.append(item)
+    if len(frames) == 0:
+        return None, read_objects
+    return pd.concat(frames, ignore_index=True), read_objects
+
+
+def mark_processed(client, bucket, state_key, objects, detected=None):
+    state = read_state(client, bucket, state_key)
+    listed = state.get("Listed", {})
+    watched = state.get("Watched", {})
+    for item in objects:
+        (watched if item.get("Watched") else listed)[item["Key"]] = item["ETag"]
+    pending = [item["Key"] for item in detected or [] if not item.get("Watched") and listed.get(item["Key"]) != item["ETag"]]
+    start_after = state.get("StartAfter", "")
+    for key in sorted(listed):
+        if len(pending) > 0 and key >= min(pending):
+            break
+        start_after = max(start_after, key)
+    state = {
+        "StartAfter": start_after,
+        "Listed": {key: etag for key, etag in listed.items() if key > start_after},
+        "Watched": watched
+    }
+    write_state(client, bucket, state_key, state)
+
+
+class S3NewDataSensor(BaseSensorOperator):
+    template_fields = ("bucket_name", "prefix", "state_key", "watch_keys")
+
+    def __init__(self, *, bucket_name, prefix, state_key, watch_keys=(), region_name=None, mode="reschedule", **kwargs):
+        super().__init__(mode=mode, **kwargs)
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.state_key = state_key
+        self.watch_keys = watch_keys
+        self.region_name = region_name
+
+    def poke(self, context):
+        client = get_client(self.region_name)
+        state = read_state(client, self.bucket_name, self.state_key)
+        new_objects = list_new_objects(client, self.bucket_name, self.prefix, state, self.watch_keys)
+        self.log.info(f"{len(new_objects)} new objects under s3://{self.bucket_name}/{self.prefix} after {state.get('StartAfter') or 'the start'}")
+        if len(new_objects) == 0:
+            return False
+        context["ti"].xcom_push(key="NewObjects", value=new_objects)
+        return True
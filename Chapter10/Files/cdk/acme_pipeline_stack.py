@@ -7,7 +7,7 @@ from constructs import Construct
 
 class PipelineStack(cdk.Stack):
 
-    def __init__(self, scope: Construct, id: str, *, model_name: str=None, group_name: str=None, repo_name: str=None, feature_group: str=None, threshold: float=None, cdk_version: str=None, **kwargs) -> None:
+    def __init__(self, scope: Construct, id: str, *, model_name: str=None, group_name: str=None, repo_name: str=None, feature_group: str=None, threshold: float=None, cdk_version: str=None, sweep: dict=None, transform: dict=None, training_instances: int=1, input_mode: str='File', use_spot: bool=False, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
         self.code_repo = codecommit.Repository(
@@ -9,6 +9,28 @@ FEATURE_GROUP = "PLACEHOLDER"
 CODECOMMIT_REPOSITORY = "acme-web-application"
 CDK_VERSION = "2.3.0"
 QUALITY_THRESHOLD = 3.1
+SWEEP = None
+# SWEEP = {
+#     "strategy": "grid",
+#     "parameters": {"epochs": [100, 200], "batch_size": [8, 16]},
+#     "max_trials": 4,
+#     "max_concurrency": 2,
+#     "max_runtime": 1800,
+#     "objective": "validation_loss",
+#     "goal": "Minimize"
+# }
+TRANSFORM = None
+# TRANSFORM = {
+#     "instance_type": "ml.m5.xlarge",
+#     "instance_count": 2,
+#     "max_concurrency": 4,
+#     "max_payload": 6
+# }
+TRAINING_INSTANCES = 1
+INPUT_MODE = "File"
+# INPUT_MODE = "FastFile"
+# INPUT_MODE = "Pipe"
+USE_SPOT = False
 
 app = cdk.App()
 
@@ -22,6 +44,11 @@ PipelineStack(
     feature_group=FEATURE_GROUP,
     cdk_version=CDK_VERSION,
     threshold=QUALITY_THRESHOLD,
+    sweep=SWEEP,
+    transform=TRANSFORM,
+    training_instances=TRAINING_INSTANCES,
+    input_mode=INPUT_MODE,
+    use_spot=USE_SPOT,
 )
 
 app.synth()
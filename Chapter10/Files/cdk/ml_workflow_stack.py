@@ -1,4 +1,6 @@
 import os
+import copy
+import math
 import aws_cdk as cdk
 import aws_cdk.aws_s3 as s3
 import aws_cdk.aws_s3_deployment as s3_deployment
@@ -15,7 +17,7 @@ from constructs import Construct
 
 class MLWorkflowStack(cdk.Stack):
 
-    def __init__(self, scope: Construct, id: str, *, group_name: str=None, threshold: float=None, data_bucket_name: str=None, feature_group_name: str=None, **kwargs):
+    def __init__(self, scope: Construct, id: str, *, group_name: str=None, threshold: float=None, data_bucket_name: str=None, feature_group_name: str=None, sweep: dict=None, transform: dict=None, training_instances: int=1, input_mode: str='File', use_spot: bool=False, model_name: str=None, **kwargs):
         super().__init__(scope, id, **kwargs)
 
         data_bucket = s3.Bucket.from_bucket_name(
@@ -62,8 +64,12 @@ class MLWorkflowStack(cdk.Stack):
             handler="index.lambda_handler",
             runtime=lambda_.Runtime.PYTHON_3_8,
             code=lambda_.Code.from_asset(os.path.join(os.path.dirname(__file__), "../../lambda/registryCreator")),
-            memory_size=128,
-            timeout=cdk.Duration.seconds(120)
+            environment={
+                "MAX_WORKERS": "16",
+                "MAX_RETRIES": "8"
+            },
+            memory_size=256,
+            timeout=cdk.Duration.minutes(15)
         )
         registry_creator.add_to_role_policy(
             iam.PolicyStatement(
@@ -113,6 +119,11 @@ class MLWorkflowStack(cdk.Stack):
             handler="index.lambda_handler",
             runtime=lambda_.Runtime.PYTHON_3_8,
             code=lambda_.Code.from_asset(os.path.join(os.path.dirname(__file__), "../../lambda/createExperiment")),
+            environment={
+                "MODEL_NAME": model_name or "",
+                "PACKAGE_PARAMETER": package_paramter.parameter_name,
+                "BASELINE_PARAMETER": baseline_paramater.parameter_name
+            },
             memory_size=128,
             timeout=cdk.Duration.seconds(120)
         )
@@ -122,7 +133,10 @@ class MLWorkflowStack(cdk.Stack):
                     "sagemaker:ListExperiments",
                     "sagemaker:CreateExperiment",
                     "sagemaker:CreateTrial*",
-                    "codepipeline:GetPipelineState"
+                    "sagemaker:DescribeFeatureGroup",
+                    "codepipeline:GetPipelineState",
+                    "s3:GetObject",
+                    "s3:ListBucket"
                 ],
                 effect=iam.Effect.ALLOW,
                 resources=["*"]
@@ -153,6 +167,15 @@ class MLWorkflowStack(cdk.Stack):
         )
         data_bucket.grant_read(evaluate_results)
         package_paramter.grant_read(evaluate_results)
+        evaluate_results.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=[
+                    "ssm:GetParameter"
+                ],
+                effect=iam.Effect.ALLOW,
+                resources=[f"arn:aws:ssm:{self.region}:{self.account}:parameter/ModelPackageName-*"]
+            )
+        )
 
         register_model = lambda_.Function(
             self,
@@ -183,6 +206,55 @@ class MLWorkflowStack(cdk.Stack):
         model_image.repository.grant_pull_push(register_model)
         package_paramter.grant_write(register_model)
         baseline_paramater.grant_write(register_model)
+        register_model.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=[
+                    "ssm:PutParameter"
+                ],
+                effect=iam.Effect.ALLOW,
+                resources=[
+                    f"arn:aws:ssm:{self.region}:{self.account}:parameter/ModelPackageName-*",
+                    f"arn:aws:ssm:{self.region}:{self.account}:parameter/BaselineDataUri-*"
+                ]
+            )
+        )
+
+        if sweep is not None:
+            select_trial = lambda_.Function(
+                self,
+                "Select-Trial",
+                handler="index.lambda_handler",
+                runtime=lambda_.Runtime.PYTHON_3_8,
+                code=lambda_.Code.from_asset(os.path.join(os.path.dirname(__file__), "../../lambda/selectTrial")),
+                memory_size=128,
+                timeout=cdk.Duration.seconds(120)
+            )
+            select_trial.add_to_role_policy(
+                iam.PolicyStatement(
+                    actions=[
+                        "sagemaker:DescribeTrainingJob",
+                        "sagemaker:CreateTrialComponent",
+                        "sagemaker:AssociateTrialComponent"
+                    ],
+                    effect=iam.Effect.ALLOW,
+                    resources=["*"]
+                )
+            )
+
+        if transform is not None:
+            transform_metrics = lambda_.Function(
+                self,
+                "Transform-Metrics",
+                handler="index.lambda_handler",
+                runtime=lambda_.Runtime.PYTHON_3_8,
+                code=lambda_.Code.from_asset(os.path.join(os.path.dirname(__file__), "../../lambda/transformMetrics")),
+                environment={
+                    "BUCKET": data_bucket.bucket_name
+                },
+                memory_size=256,
+                timeout=cdk.Duration.minutes(5)
+            )
+            data_bucket.grant_read_write(transform_metrics)
 
         processing_definition = {
             'Type': 'Task',
@@ -270,7 +342,7 @@ class MLWorkflowStack(cdk.Stack):
                 'TrainingJobName.$': '$.createExperiment.Payload.trainingJobName',
                 'AlgorithmSpecification': {
                     'TrainingImage': model_image.image_uri,
-                    'TrainingInputMode': 'File',
+                    'TrainingInputMode': input_mode,
                     'EnableSageMakerMetricsTimeSeries': True,
                     'MetricDefinitions': [
                         {
@@ -317,11 +389,16 @@ class MLWorkflowStack(cdk.Stack):
                     'S3OutputPath.$': '$.createExperiment.Payload.trainingModelOutput'
                 },
                 'ResourceConfig': {
-                    'InstanceCount': 1,
+                    'InstanceCount': training_instances,
                     'InstanceType': 'ml.m5.xlarge',
                     'VolumeSizeInGB': 30
                 },
                 'RoleArn': step_functions_role.role_arn,
+                'EnableManagedSpotTraining': use_spot,
+                'CheckpointConfig': {
+                    'S3Uri.$': '$.createExperiment.Payload.trainingCheckpointOutput',
+                    'LocalPath': '/opt/ml/checkpoints'
+                },
                 'StoppingCondition': {
                     'MaxRuntimeInSeconds': 3600
                 }
@@ -338,6 +415,109 @@ class MLWorkflowStack(cdk.Stack):
             ]
         }
 
+        if input_mode == 'Pipe':
+            training_definition['Parameters']['InputDataConfig'] = [
+                {
+                    'ChannelName': channel,
+                    'ContentType': 'text/csv',
+                    'DataSource': {
+                        'S3DataSource': {
+                            'S3DataDistributionType': 'FullyReplicated',
+                            'S3DataType': 'S3Prefix',
+                            'S3Uri.$': f"States.Format('{{}}/{channel}', $.createExperiment.Payload.trainingDataInput)"
+                        }
+                    }
+                } for channel in ['training', 'validation']
+            ]
+
+        sweep_training_parameters = copy.deepcopy(training_definition['Parameters'])
+        del sweep_training_parameters['HyperParameters']
+        sweep_training_parameters.update(
+            {
+                'TrainingJobName.$': '$.trial.trainingJobName',
+                'HyperParameters.$': '$.trial.hyperParameters',
+                'ExperimentConfig': {
+                    'ExperimentName.$': '$.experimentName',
+                    'TrialName.$': '$.trialName',
+                    'TrialComponentDisplayName.$': '$.trial.trialComponentDisplayName'
+                },
+                'OutputDataConfig': {
+                    'S3OutputPath.$': '$.trial.trainingModelOutput'
+                },
+                'CheckpointConfig': {
+                    'S3Uri.$': '$.trial.checkpointOutput',
+                    'LocalPath': '/opt/ml/checkpoints'
+                },
+                'StoppingCondition': {
+                    'MaxRuntimeInSeconds': (sweep or {}).get('max_runtime', 3600)
+                }
+            }
+        )
+        workflow_timeout = cdk.Duration.minutes(60)
+        if use_spot:
+            training_definition['Parameters']['StoppingCondition']['MaxWaitTimeInSeconds'] = 2 * training_definition['Parameters']['StoppingCondition']['MaxRuntimeInSeconds']
+            sweep_training_parameters['StoppingCondition']['MaxWaitTimeInSeconds'] = 2 * sweep_training_parameters['StoppingCondition']['MaxRuntimeInSeconds']
+            training_wait = training_definition['Parameters']['StoppingCondition']['MaxWaitTimeInSeconds']
+            if sweep is not None:
+                trials = sweep.get('max_trials', math.prod(len(values) for values in sweep['parameters'].values()) if sweep.get('strategy', 'grid') == 'grid' else 4)
+                training_wait = math.ceil(int(trials) / sweep.get('max_concurrency', 2)) * sweep_training_parameters['StoppingCondition']['MaxWaitTimeInSeconds']
+            workflow_timeout = workflow_timeout.plus(cdk.Duration.seconds(training_wait))
+        for channel in sweep_training_parameters['InputDataConfig']:
+            channel['DataSource']['S3DataSource']['S3Uri.$'] = channel['DataSource']['S3DataSource']['S3Uri.$'].replace('$.createExperiment.Payload.trainingDataInput', '$.trainingDataInput')
+
+        sweep_definition = {
+            'Type': 'Map',
+            'ItemsPath': '$.createExperiment.Payload.sweepTrials',
+            'MaxConcurrency': (sweep or {}).get('max_concurrency', 2),
+            'Parameters': {
+                'trial.$': '$$.Map.Item.Value',
+                'experimentName.$': '$.createExperiment.Payload.experimentName',
+                'trialName.$': '$.createExperiment.Payload.trialName',
+                'trainingDataInput.$': '$.createExperiment.Payload.trainingDataInput'
+            },
+            'Iterator': {
+                'StartAt': 'Sweep Training Job',
+                'States': {
+                    'Sweep Training Job': {
+                        'Type': 'Task',
+                        'Resource': 'arn:aws:states:::sagemaker:createTrainingJob.sync',
+                        'Parameters': sweep_training_parameters,
+                        'ResultSelector': {
+                            'TrainingJobName.$': '$.TrainingJobName'
+                        },
+                        'Catch': [
+                            {
+                                'ErrorEquals': [
+                                    'States.ALL'
+                                ],
+                                'ResultPath': '$.error',
+                                'Next': 'Sweep Trial Failed'
+                            }
+                        ],
+                        'End': True
+                    },
+                    'Sweep Trial Failed': {
+                        'Type': 'Pass',
+                        'Parameters': {
+                            'TrainingJobName.$': '$.trial.trainingJobName',
+                            'Failed': True
+                        },
+                        'End': True
+                    }
+                }
+            },
+            'ResultPath': '$.sweepJobs',
+            'Catch': [
+                {
+                    'ErrorEquals': [
+                        'States.ALL'
+                    ],
+                    'ResultPath': '$.error',
+                    'Next': 'Workflow Failed'
+                }
+            ]
+        }
+
         evaluation_definition = {
             'Type': 'Task',
             'Resource': 'arn:aws:states:::sagemaker:createProcessingJob.sync',
@@ -405,6 +585,9 @@ class MLWorkflowStack(cdk.Stack):
                         '/opt/ml/processing/input/code/evaluation.py'
                     ]
                 },
+                'Environment': {
+                    'INFERENCE_ENGINE': 'numpy'
+                },
                 'ExperimentConfig': {
                     'ExperimentName.$': '$.createExperiment.Payload.experimentName',
                     'TrialName.$': '$.createExperiment.Payload.trialName',
@@ -434,29 +617,207 @@ class MLWorkflowStack(cdk.Stack):
             ]
         }
 
+        transform_model_definition = {
+            'Type': 'Task',
+            'Resource': 'arn:aws:states:::sagemaker:createModel',
+            'Parameters': {
+                'ModelName.$': '$.createExperiment.Payload.evaluationJobName',
+                'PrimaryContainer': {
+                    'Image': model_image.image_uri,
+                    'ModelDataUrl.$': '$.trainingJob.ModelArtifacts.S3ModelArtifacts'
+                },
+                'ExecutionRoleArn': step_functions_role.role_arn
+            },
+            'ResultPath': None,
+            'Catch': [
+                {
+                    'ErrorEquals': [
+                        'States.ALL'
+                    ],
+                    'ResultPath': '$.error',
+                    'Next': 'Workflow Failed'
+                }
+            ]
+        }
+
+        transform_definition = {
+            'Type': 'Task',
+            'Resource': 'arn:aws:states:::sagemaker:createTransformJob.sync',
+            'Parameters': {
+                'TransformJobName.$': '$.createExperiment.Payload.evaluationJobName',
+                'ModelName.$': '$.createExperiment.Payload.evaluationJobName',
+                'BatchStrategy': 'MultiRecord',
+                'MaxPayloadInMB': (transform or {}).get('max_payload', 6),
+                'MaxConcurrentTransforms': (transform or {}).get('max_concurrency', 4),
+                'TransformInput': {
+                    'DataSource': {
+                        'S3DataSource': {
+                            'S3DataType': 'S3Prefix',
+                            'S3Uri.$': '$.createExperiment.Payload.transformDataInput'
+                        }
+                    },
+                    'ContentType': 'text/csv',
+                    'CompressionType': 'None',
+                    'SplitType': 'Line'
+                },
+                'TransformOutput': {
+                    'S3OutputPath.$': '$.createExperiment.Payload.transformOutput',
+                    'Accept': 'text/csv',
+                    'AssembleWith': 'Line'
+                },
+                'TransformResources': {
+                    'InstanceType': (transform or {}).get('instance_type', 'ml.m5.xlarge'),
+                    'InstanceCount': (transform or {}).get('instance_count', 1)
+                },
+                'DataProcessing': {
+                    'InputFilter': '$[1:]',
+                    'JoinSource': 'Input',
+                    'OutputFilter': '$'
+                },
+                'ExperimentConfig': {
+                    'ExperimentName.$': '$.createExperiment.Payload.experimentName',
+                    'TrialName.$': '$.createExperiment.Payload.trialName',
+                    'TrialComponentDisplayName': 'Evaluation'
+                }
+            },
+            'ResultPath': '$.evaluationJob',
+            'Catch': [
+                {
+                    'ErrorEquals': [
+                        'States.ALL'
+                    ],
+                    'ResultPath': '$.error',
+                    'Next': 'Delete Evaluation Model'
+                }
+            ]
+        }
+
+        delete_model_definition = {
+            'Type': 'Task',
+            'Resource': 'arn:aws:states:::aws-sdk:sagemaker:deleteModel',
+            'Parameters': {
+                'ModelName.$': '$.createExperiment.Payload.evaluationJobName'
+            },
+            'ResultPath': None,
+            'Catch': [
+                {
+                    'ErrorEquals': [
+                        'States.ALL'
+                    ],
+                    'ResultPath': '$.error',
+                    'Next': 'Workflow Failed'
+                }
+            ]
+        }
+
+        def cache_definition(stage, body_path):
+            return {
+                'Type': 'Task',
+                'Resource': 'arn:aws:states:::aws-sdk:s3:putObject',
+                'Parameters': {
+                    'Bucket': data_bucket.bucket_name,
+                    'Key.$': f'$.createExperiment.Payload.cache.{stage}.marker',
+                    'Body.$': body_path
+                },
+                'ResultPath': None,
+                'Catch': [
+                    {
+                        'ErrorEquals': [
+                            'States.ALL'
+                        ],
+                        'ResultPath': '$.error',
+                        'Next': 'Workflow Failed'
+                    }
+                ]
+            }
+
+        def cache_hit(stage):
+            return sfn.Condition.string_equals(f"$.createExperiment.Payload.cache.{stage}.status", "HIT")
+
         failure_state = sfn.Fail(self, "Workflow Failed", cause="WorkflowFailed")
 
+        experiment_payload = {
+            "modelName.$": "$.input.model_name",
+            "pipelineName.$": "$.input.pipeline_name",
+            "dataBucket.$": "$.input.data_bucket",
+            "stageName.$": "$.input.stage_name",
+            "actionName.$": "$.input.action_name",
+            "featureGroupName": feature_group_name,
+            "imageUri": model_image.image_uri,
+            "hyperParameters": training_definition['Parameters']['HyperParameters'] if sweep is None else sweep,
+            "instanceCount": training_definition['Parameters']['ResourceConfig']['InstanceCount'],
+            "inputMode": training_definition['Parameters']['AlgorithmSpecification']['TrainingInputMode']
+        }
+        if sweep is not None:
+            experiment_payload["sweep"] = sweep
+        if transform is not None:
+            experiment_payload["evaluationMode"] = "transform"
+
         create_experiment_step = tasks.LambdaInvoke(
             self,
             "Create SageMaker Experiment",
             lambda_function=experiment_creator,
             result_path="$.createExperiment",
-            payload=sfn.TaskInput.from_object(
-                {
-                    "modelName.$": "$.input.model_name",
-                    "pipelineName.$": "$.input.pipeline_name",
-                    "dataBucket.$": "$.input.data_bucket",
-                    "stageName.$": "$.input.stage_name",
-                    "actionName.$": "$.input.action_name"
-                }
-            )
+            payload=sfn.TaskInput.from_object(experiment_payload)
         ).add_catch(failure_state, result_path="$.error")
 
         processing_step = sfn.CustomState(self, "Data Preprocessing Job", state_json=processing_definition)
 
-        training_step = sfn.CustomState(self, "Model Training Job", state_json=training_definition)
+        if sweep is None:
+            training_step = sfn.CustomState(self, "Model Training Job", state_json=training_definition)
+        else:
+            sweep_step = sfn.CustomState(self, "Hyperparameter Sweep", state_json=sweep_definition)
+
+            select_trial_step = tasks.LambdaInvoke(
+                self,
+                "Select Best Sweep Trial",
+                lambda_function=select_trial,
+                result_path="$.trainingJob",
+                payload_response_only=True,
+                payload=sfn.TaskInput.from_object(
+                    {
+                        "trials.$": "$.sweepJobs",
+                        "objective": sweep.get("objective", "validation_loss"),
+                        "goal": sweep.get("goal", "Minimize"),
+                        "trialName.$": "$.createExperiment.Payload.trialName"
+                    }
+                )
+            ).add_catch(failure_state, result_path="$.error")
+
+            training_step = sfn.Chain.start(sweep_step).next(select_trial_step)
+
+        if transform is None:
+            evaluation_step = sfn.CustomState(self, "Model Evaluation Job", state_json=evaluation_definition)
+        else:
+            transform_model_step = sfn.CustomState(self, "Create Evaluation Model", state_json=transform_model_definition)
+
+            transform_step = sfn.CustomState(self, "Batch Transform Evaluation Job", state_json=transform_definition)
+
+            transform_metrics_step = tasks.LambdaInvoke(
+                self,
+                "Compute Evaluation Metrics",
+                lambda_function=transform_metrics,
+                result_path="$.transformMetrics",
+                payload=sfn.TaskInput.from_object(
+                    {
+                        "transformOutput.$": "$.createExperiment.Payload.transformOutput",
+                        "evaluationFile.$": "$.createExperiment.Payload.evaluationOutputFile",
+                        "baselineUri.$": "$.createExperiment.Payload.baselineDataInput"
+                    }
+                )
+            ).add_catch(failure_state, result_path="$.error")
+
+            delete_model_step = sfn.CustomState(self, "Delete Evaluation Model", state_json=delete_model_definition)
 
-        evaluation_step = sfn.CustomState(self, "Model Evaluation Job", state_json=evaluation_definition)
+            transform_choice = sfn.Choice(self, "Did the Transform Job Succeed?")
+
+            transform_choice.when(sfn.Condition.is_present("$.error"), failure_state)
+
+            transform_choice.otherwise(transform_metrics_step)
+
+            transform_model_step.next(transform_step).next(delete_model_step).next(transform_choice)
+
+            evaluation_step = sfn.Chain.custom(transform_model_step, [transform_metrics_step], transform_metrics_step)
 
         results_step = tasks.LambdaInvoke(
             self,
@@ -465,7 +826,8 @@ class MLWorkflowStack(cdk.Stack):
             result_path="$.evaluateResults",
             payload=sfn.TaskInput.from_object(
                 {
-                    "evaluationFile.$": "$.createExperiment.Payload.evaluationOutputFile"
+                    "evaluationFile.$": "$.createExperiment.Payload.evaluationOutputFile",
+                    "packageParameter.$": "$.createExperiment.Payload.packageParameter"
                 }
             )
         ).add_catch(failure_state, result_path="$.error")
@@ -480,7 +842,9 @@ class MLWorkflowStack(cdk.Stack):
                   "modelUri.$": "$.trainingJob.ModelArtifacts.S3ModelArtifacts",
                   "evaluationUri.$": "$.createExperiment.Payload.evaluationOutputFile",
                   "baselineUri.$": "$.createExperiment.Payload.baselineDataInput",
-                  "executionId.$": "$.createExperiment.Payload.executionId"
+                  "executionId.$": "$.createExperiment.Payload.executionId",
+                  "packageParameter.$": "$.createExperiment.Payload.packageParameter",
+                  "baselineParameter.$": "$.createExperiment.Payload.baselineParameter"
                 }
             )
         ).add_catch(failure_state, result_path="$.error")
@@ -505,16 +869,43 @@ class MLWorkflowStack(cdk.Stack):
 
         quality_choice.otherwise(quality_failed_state)
 
+        processing_cache_step = sfn.CustomState(self, "Cache Preprocessing Output", state_json=cache_definition("preprocessing", "$$.Execution.Id"))
+
+        training_cache_step = sfn.CustomState(self, "Cache Training Output", state_json=cache_definition("training", "States.JsonToString($.trainingJob.ModelArtifacts)"))
+
+        evaluation_cache_step = sfn.CustomState(self, "Cache Evaluation Output", state_json=cache_definition("evaluation", "$$.Execution.Id"))
+
+        training_cached_state = sfn.Pass(
+            self,
+            "Reuse Cached Model",
+            parameters={
+                "ModelArtifacts.$": "$.createExperiment.Payload.cache.training.modelArtifacts"
+            },
+            result_path="$.trainingJob"
+        )
+
+        results_step.next(quality_choice)
+
+        evaluation_choice = sfn.Choice(self, "Is the Evaluation Cached?")
+
+        evaluation_choice.when(cache_hit("evaluation"), results_step)
+
+        evaluation_choice.otherwise(evaluation_step.next(evaluation_cache_step).next(results_step))
+
+        training_choice = sfn.Choice(self, "Is the Model Cached?")
+
+        training_choice.when(cache_hit("training"), training_cached_state.next(evaluation_choice))
+
+        training_choice.otherwise(training_step.next(training_cache_step).next(evaluation_choice))
+
+        processing_choice = sfn.Choice(self, "Is the Preprocessed Data Cached?")
+
+        processing_choice.when(cache_hit("preprocessing"), training_choice)
+
+        processing_choice.otherwise(processing_step.next(processing_cache_step).next(training_choice))
+
         workflow_definition = create_experiment_step.next(
-            processing_step
-        ).next(
-            training_step
-        ).next(
-            evaluation_step
-        ).next(
-            results_step
-        ).next(
-            quality_choice
+            processing_choice
         )
 
         workflow = sfn.StateMachine(
@@ -522,7 +913,7 @@ class MLWorkflowStack(cdk.Stack):
             'MLWorkflow',
             definition=workflow_definition,
             role=step_functions_role,
-            timeout=cdk.Duration.minutes(60)
+            timeout=workflow_timeout
         )
         
         self.sfn_output = cdk.CfnOutput(self, "StateMachine-Arn", value=workflow.state_machine_arn)
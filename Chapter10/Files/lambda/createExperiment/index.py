@@ -1,13 +1,20 @@
 import os
+import json
+import random
+import hashlib
 import logging
+import itertools
 import boto3
 import botocore
 from botocore.exceptions import ClientError
+from urllib.parse import urlparse
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 cp = boto3.client("codepipeline")
 sm = boto3.client("sagemaker")
+s3 = boto3.client("s3")
+cached_stages = ["preprocessing", "training", "evaluation"]
 
 
 def lambda_handler(event, context):
@@ -41,9 +48,33 @@ def lambda_handler(event, context):
         data_bucket = event["dataBucket"]
     else:
         raise KeyError("'Data Bucket Name' not found in Lambda event!")
+
+    if ("featureGroupName" in event):
+        feature_group_name = event["featureGroupName"]
+    else:
+        raise KeyError("'Feature Group Name' not found in Lambda event!")
+
+    if ("imageUri" in event):
+        image_uri = event["imageUri"]
+    else:
+        raise KeyError("'Model Image URI' not found in Lambda event!")
+
+    if ("hyperParameters" in event):
+        hyperparameters = event["hyperParameters"]
+    else:
+        raise KeyError("'Training Hyperparameters' not found in Lambda event!")
     
+    evaluation_mode = event["evaluationMode"] if "evaluationMode" in event else "processing"
+    instance_count = event["instanceCount"] if "instanceCount" in event else 1
+    input_mode = event["inputMode"] if "inputMode" in event else "File"
+
     execution_id = get_executionId(pipeline_name, stage_name, action_name)
     experiment_name, trial_name = create_experiment(model_name, execution_id)
+    fingerprints = get_fingerprints(data_bucket, feature_group_name, image_uri, hyperparameters, instance_count, input_mode, evaluation_mode)
+    cache = check_cache(data_bucket, fingerprints)
+    preprocessing_prefix = f"cache/preprocessing/{fingerprints['preprocessing']}"
+    training_prefix = f"cache/training/{fingerprints['training']}"
+    evaluation_prefix = f"cache/evaluation/{fingerprints['evaluation']}"
 
     payload = {
         "statusCode": 200,
@@ -52,23 +83,38 @@ def lambda_handler(event, context):
         "trialName": trial_name,
         "processingJobName": f"{model_name}-processing-{execution_id}",
         "processingCodeInput": f"s3://{data_bucket}/scripts/preprocessing.py",
-        "processingTrainingOutput": f"s3://{data_bucket}/{execution_id}/input/training",
-        "processingTestingOutput": f"s3://{data_bucket}/{execution_id}/input/testing",
-        "processingBaselineOutput": f"s3://{data_bucket}/{execution_id}/input/baseline",
+        "processingTrainingOutput": f"s3://{data_bucket}/{preprocessing_prefix}/input/training",
+        "processingTestingOutput": f"s3://{data_bucket}/{preprocessing_prefix}/input/testing",
+        "processingBaselineOutput": f"s3://{data_bucket}/{evaluation_prefix}/input/baseline",
         "trainingJobName": f"{model_name}-training-{execution_id}",
-        "trainingDataInput": f"s3://{data_bucket}/{execution_id}/input/training",
-        "trainingModelOutput": f"s3://{data_bucket}/{execution_id}/",
+        "trainingDataInput": f"s3://{data_bucket}/{preprocessing_prefix}/input/training",
+        "trainingModelOutput": f"s3://{data_bucket}/{training_prefix}/",
+        "trainingCheckpointOutput": f"s3://{data_bucket}/{execution_id}/{model_name}/checkpoints",
         "evaluationJobName": f"{model_name}-evaluation-{execution_id}",
-        "evaluationCodeInput": f"s3://{data_bucket}/scripts/evaluation.py",
-        "evaluationDataInput": f"s3://{data_bucket}/{execution_id}/input/testing/testing.csv",
-        "evaluationOutput": f"s3://{data_bucket}/{execution_id}/input/evaluation",
-        "evaluationOutputFile": f"{execution_id}/input/evaluation/evaluation.json",
-        "baselineDataInput": f"s3://{data_bucket}/{execution_id}/input/baseline/baseline.csv",
+        "evaluationCodeInput": f"s3://{data_bucket}/scripts/",
+        "evaluationDataInput": f"s3://{data_bucket}/{preprocessing_prefix}/input/testing/testing.csv",
+        "evaluationOutput": f"s3://{data_bucket}/{evaluation_prefix}/input/evaluation",
+        "evaluationOutputFile": f"{evaluation_prefix}/input/evaluation/evaluation.json",
+        "baselineDataInput": f"s3://{data_bucket}/{evaluation_prefix}/input/baseline/baseline.csv",
+        "transformDataInput": f"s3://{data_bucket}/{preprocessing_prefix}/input/testing/",
+        "transformOutput": f"s3://{data_bucket}/{evaluation_prefix}/input/transform",
+        "packageParameter": get_parameter_name(os.environ["PACKAGE_PARAMETER"], model_name),
+        "baselineParameter": get_parameter_name(os.environ["BASELINE_PARAMETER"], model_name),
+        "cache": cache
     }
 
+    if ("sweep" in event):
+        payload["sweepTrials"] = create_sweep_trials(model_name, execution_id, data_bucket, event["sweep"])
+
     return payload
 
 
+def get_parameter_name(parameter_name, model_name):
+    if model_name == (os.environ.get("MODEL_NAME") or model_name):
+        return parameter_name
+    return f"{parameter_name}-{model_name}"
+
+
 def get_executionId(pipeline_name, stage_name, action_name):
     logger.info(f"Getting the latest CodePipeline Execution ID for {pipeline_name}")
     try:
@@ -126,4 +172,105 @@ def create_experiment(model_name, execution_id):
         logger.error(error_message)
         raise Exception(error_message)
     
-    return experiment_name, trial_name
\ No newline at end of file
+    return experiment_name, trial_name
+
+
+def get_fingerprints(data_bucket, feature_group_name, image_uri, hyperparameters, instance_count, input_mode, evaluation_mode):
+    logger.info("Calculating Step Cache Fingerprints")
+    data_snapshot = get_data_snapshot(feature_group_name)
+    preprocessing = get_fingerprint(data_snapshot, get_etag(data_bucket, "scripts/preprocessing.py"), image_uri)
+    training = get_fingerprint(preprocessing, image_uri, hyperparameters, instance_count, input_mode)
+    evaluation = get_fingerprint(training, get_etag(data_bucket, "scripts/evaluation.py"), get_etag(data_bucket, "scripts/inference.py"), get_etag(data_bucket, "scripts/features.py"), image_uri, evaluation_mode)
+    return dict(zip(cached_stages, [preprocessing, training, evaluation]))
+
+
+def get_fingerprint(*inputs):
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+def get_data_snapshot(feature_group_name):
+    logger.info(f"Getting Offline Store snapshot for Feature Group: {feature_group_name}")
+    try:
+        uri = sm.describe_feature_group(
+            FeatureGroupName=feature_group_name
+        )["OfflineStoreConfig"]["S3StorageConfig"]["ResolvedOutputS3Uri"]
+        digest = hashlib.sha256()
+        paginator = s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=urlparse(uri).netloc, Prefix=urlparse(uri).path.lstrip("/")):
+            for obj in page.get("Contents", []):
+                digest.update(f"{obj['Key']}:{obj['ETag']}\n".encode("utf-8"))
+        return digest.hexdigest()
+    except ClientError as e:
+        error_message = e.response["Error"]["Message"]
+        logger.error(error_message)
+        raise Exception(error_message)
+
+
+def get_etag(bucket, key):
+    try:
+        return s3.head_object(Bucket=bucket, Key=key)["ETag"]
+    except ClientError as e:
+        error_message = e.response["Error"]["Message"]
+        logger.error(error_message)
+        raise Exception(error_message)
+
+
+def check_cache(data_bucket, fingerprints):
+    cache = {}
+    upstream_hit = True
+    for stage in cached_stages:
+        entry = {
+            "fingerprint": fingerprints[stage],
+            "marker": f"cache/{stage}/{fingerprints[stage]}/_SUCCESS",
+            "status": "MISS"
+        }
+        if upstream_hit:
+            try:
+                body = s3.get_object(Bucket=data_bucket, Key=entry["marker"])["Body"].read()
+                entry["status"] = "HIT"
+                if stage == "training":
+                    entry["modelArtifacts"] = json.loads(body)
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in ["NoSuchKey", "404"]:
+                    error_message = e.response["Error"]["Message"]
+                    logger.error(error_message)
+                    raise Exception(error_message)
+        upstream_hit = entry["status"] == "HIT"
+        logger.info(f"Step Cache {entry['status']} for {stage}: {entry['fingerprint']}")
+        cache[stage] = entry
+    return cache
+
+
+def create_sweep_trials(model_name, execution_id, data_bucket, sweep):
+    logger.info(f"Creating {sweep.get('strategy', 'grid')} search Hyperparameter Sweep")
+    parameters = sweep["parameters"]
+    names = sorted(parameters)
+    if sweep.get("strategy", "grid") == "grid":
+        candidates = [dict(zip(names, values)) for values in itertools.product(*[parameters[name] for name in names])]
+    elif sweep["strategy"] == "random":
+        rng = random.Random(sweep.get("seed", execution_id))
+        candidates = [{name: sample_parameter(rng, parameters[name]) for name in names} for _ in range(int(sweep.get("max_trials", 4)))]
+    else:
+        raise ValueError(f"Unsupported Hyperparameter Sweep strategy: {sweep['strategy']}")
+
+    trials = []
+    for index, candidate in enumerate(candidates[:int(sweep.get("max_trials", len(candidates)))]):
+        trials.append(
+            {
+                "trainingJobName": f"{model_name}-sweep-{index}-{execution_id}",
+                "trainingModelOutput": f"s3://{data_bucket}/{execution_id}/{model_name}/sweep/{index}/",
+                "checkpointOutput": f"s3://{data_bucket}/{execution_id}/{model_name}/sweep/{index}/checkpoints",
+                "trialComponentDisplayName": f"Training-{index}",
+                "hyperParameters": {name: str(value) for name, value in candidate.items()}
+            }
+        )
+    logger.info(f"Created {len(trials)} Hyperparameter Sweep trials")
+    return trials
+
+
+def sample_parameter(rng, values):
+    if isinstance(values, dict):
+        if isinstance(values["min"], int) and isinstance(values["max"], int):
+            return rng.randint(values["min"], values["max"])
+        return round(rng.uniform(values["min"], values["max"]), 6)
+    return rng.choice(values)
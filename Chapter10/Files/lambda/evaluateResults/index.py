@@ -37,7 +37,7 @@ def lambda_handler(event, context):
     current_rmse = current_report["regression_metrics"]["rmse"]["value"]
 
     logger.info("Reading Previous Model's Evaluation Report")
-    model_package = get_package(os.environ["PACKAGE_PARAMETER"])
+    model_package = get_package(event.get("packageParameter", os.environ["PACKAGE_PARAMETER"]))
     if model_package != "PLACEHOLDER":
         try:
             uri = sm.describe_model_package(
@@ -79,6 +79,8 @@ def get_package(parameter_name):
         return package
 
     except ClientError as e:
+        if e.response['Error']['Code'] == 'ParameterNotFound':
+            return "PLACEHOLDER"
         error_message = e.response['Error']['Message']
         logger.error(error_message)
         raise Exception(error_message)
@@ -87,7 +87,7 @@ def lambda_handler(event, context):
     try:
         logger.info("Updating SSM Parameter with the latest model package.")
         response = ssm.put_parameter(
-            Name=os.environ["PACKAGE_PARAMETER"],
+            Name=event.get("packageParameter", os.environ["PACKAGE_PARAMETER"]),
             Value=model_package_arn,
             Type="String",
             Overwrite=True
@@ -100,7 +100,7 @@ def lambda_handler(event, context):
     try:
         logger.info("Creating SSM Parameter with the latest copy of the testing data.")
         response = ssm.put_parameter(
-            Name=os.environ["BASELINE_PARAMETER"],
+            Name=event.get("baselineParameter", os.environ["BASELINE_PARAMETER"]),
             Value=baseline_uri,
             Type="String",
             Overwrite=True
@@ -1,9 +1,16 @@
 import os
+import time
+import random
 import logging
 import boto3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
-sm = boto3.client("sagemaker")
+max_workers = int(os.environ.get("MAX_WORKERS", 16))
+max_retries = int(os.environ.get("MAX_RETRIES", 8))
+throttling_errors = ["ThrottlingException", "Throttling", "TooManyRequestsException", "RequestLimitExceeded"]
+sm = boto3.client("sagemaker", config=Config(max_pool_connections=max_workers, retries={"max_attempts": 3, "mode": "standard"}))
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
@@ -43,16 +50,8 @@ def lambda_handler(event, context):
     
     elif event["RequestType"] == "Delete":
         try:
-            response = sm.list_model_packages(
-                ModelPackageGroupName=group_name,
-                ModelApprovalStatus="Approved",
-                SortBy="CreationTime",
-                MaxResults=100
-            )
-
-            for model_package in response["ModelPackageSummaryList"]:
-                sm.delete_model_package(ModelPackageName=model_package["ModelPackageArn"])
-            
+            deleted = delete_model_packages(group_name, sm)
+            logger.info(f"Deleted {deleted} Model Package versions from: {group_name}")
             sm.delete_model_package_group(ModelPackageGroupName=group_name)
             logger.info(f"Deleted Model Package Group: {group_name}")
             return {
@@ -61,6 +60,42 @@ def lambda_handler(event, context):
             }
         
         except ClientError as e:
-            error_message = e.response["Error"]["Messgae"]
+            error_message = e.response["Error"]["Message"]
             logger.error(f"Failed to delete Model Package Group: {error_message}")
-            raise Exception(error_message)
\ No newline at end of file
+            raise Exception(error_message)
+
+
+def list_model_packages(group_name, client=sm):
+    paginator = client.get_paginator("list_model_packages")
+    for page in paginator.paginate(ModelPackageGroupName=group_name, PaginationConfig={"PageSize": 100}):
+        for model_package in page["ModelPackageSummaryList"]:
+            yield model_package["ModelPackageArn"]
+
+
+def delete_model_package(package_arn, client=sm):
+    for attempt in range(max_retries + 1):
+        try:
+            client.delete_model_package(ModelPackageName=package_arn)
+            return package_arn
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in throttling_errors or attempt == max_retries:
+                raise
+            delay = min(20, 0.2 * 2 ** attempt) * random.uniform(0.5, 1.0)
+            logger.debug(f"Throttled deleting {package_arn}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+
+def delete_model_packages(group_name, client=sm, workers=max_workers, report_every=100):
+    logger.info(f"Deleting all Model Package versions in: {group_name}")
+    start = time.time()
+    deleted = 0
+    package_arns = list(list_model_packages(group_name, client))
+    logger.info(f"Found {len(package_arns)} Model Package versions")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(delete_model_package, arn, client) for arn in package_arns]
+        for future in as_completed(futures):
+            future.result()
+            deleted += 1
+            if deleted % report_every == 0 or deleted == len(futures):
+                logger.info(f"Deleted {deleted}/{len(futures)} Model Package versions ({time.time() - start:.1f}s)")
+    return deleted
@@ -0,0 +1,107 @@
+import os
+import logging
+import boto3
+from datetime import datetime
+from botocore.exceptions import ClientError
+
+sm = boto3.client("sagemaker")
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def lambda_handler(event, context):
+    logger.debug("## Environment Variables ##")
+    logger.debug(os.environ)
+    logger.debug("## Event ##")
+    logger.debug(event)
+
+    if ("trials" in event):
+        trials = event["trials"]
+    else:
+        raise KeyError("'Sweep Trials' not found in Lambda event!")
+
+    if ("objective" in event):
+        objective = event["objective"]
+    else:
+        raise KeyError("'Objective Metric' not found in Lambda event!")
+
+    if ("trialName" in event):
+        trial_name = event["trialName"]
+    else:
+        raise KeyError("'Trial Name' not found in Lambda event!")
+
+    maximize = event.get("goal", "Minimize") == "Maximize"
+    results = []
+    for trial in trials:
+        if trial.get("Failed"):
+            logger.warning(f"Skipping failed Sweep trial: {trial['TrainingJobName']}")
+            continue
+        try:
+            job = sm.describe_training_job(TrainingJobName=trial["TrainingJobName"])
+        except ClientError as e:
+            error_message = e.response["Error"]["Message"]
+            logger.error(error_message)
+            raise Exception(error_message)
+        metrics = {metric["MetricName"]: metric["Value"] for metric in job.get("FinalMetricDataList", [])}
+        if objective not in metrics:
+            logger.warning(f"Sweep trial {job['TrainingJobName']} did not report '{objective}'")
+            continue
+        logger.info(f"Sweep trial {job['TrainingJobName']}: {objective}={metrics[objective]}, {job['HyperParameters']}")
+        results.append(
+            {
+                "TrainingJobName": job["TrainingJobName"],
+                "ModelArtifacts": job["ModelArtifacts"],
+                "HyperParameters": job["HyperParameters"],
+                "ObjectiveMetric": {
+                    "Name": objective,
+                    "Value": metrics[objective]
+                }
+            }
+        )
+
+    if len(results) == 0:
+        raise Exception(f"No Sweep trials completed with a '{objective}' metric!")
+
+    best = sorted(results, key=lambda result: result["ObjectiveMetric"]["Value"], reverse=maximize)[0]
+    logger.info(f"Selected Sweep trial: {best['TrainingJobName']} ({objective}={best['ObjectiveMetric']['Value']})")
+    record_selection(trial_name, best, len(trials), len(results))
+    return best
+
+
+def record_selection(trial_name, best, total, completed):
+    component_name = f"{trial_name}-sweep-selection"
+    parameters = {
+        "objective_metric": {"StringValue": best["ObjectiveMetric"]["Name"]},
+        "objective_value": {"NumberValue": best["ObjectiveMetric"]["Value"]},
+        "selected_training_job": {"StringValue": best["TrainingJobName"]},
+        "trials": {"NumberValue": total},
+        "completed_trials": {"NumberValue": completed}
+    }
+    for name, value in best["HyperParameters"].items():
+        if not name.startswith("_") and not name.startswith("sagemaker_"):
+            parameters[f"selected_{name}"] = {"StringValue": value}
+    logger.info(f"Recording Sweep selection in Trial Component: {component_name}")
+    try:
+        now = datetime.utcnow()
+        sm.create_trial_component(
+            TrialComponentName=component_name,
+            DisplayName="Sweep-Selection",
+            Status={"PrimaryStatus": "Completed"},
+            StartTime=now,
+            EndTime=now,
+            Parameters=parameters,
+            OutputArtifacts={
+                "SelectedModel": {
+                    "MediaType": "application/x-tar",
+                    "Value": best["ModelArtifacts"]["S3ModelArtifacts"]
+                }
+            }
+        )
+        sm.associate_trial_component(
+            TrialComponentName=component_name,
+            TrialName=trial_name
+        )
+    except ClientError as e:
+        error_message = e.response["Error"]["Message"]
+        logger.error(error_message)
+        raise Exception(error_message)
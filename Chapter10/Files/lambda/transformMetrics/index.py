@@ -0,0 +1,58 @@
+import os
+import json
+import logging
+import tempfile
+import boto3
+from botocore.exceptions import ClientError
+from urllib.parse import urlparse
+from metrics import evaluate_transform_output
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+s3 = boto3.client("s3")
+
+
+def lambda_handler(event, context):
+    logger.debug("## Environment Variables ##")
+    logger.debug(os.environ)
+    logger.debug("## Event ##")
+    logger.debug(event)
+
+    if ("transformOutput" in event):
+        transform_output = event["transformOutput"]
+    else:
+        raise KeyError("'Batch Transform Output S3 URI' not found in Lambda event!")
+
+    if ("evaluationFile" in event):
+        evaluation_file = event["evaluationFile"]
+    else:
+        raise KeyError("'S3 Key for Evaluation File' not found in Lambda event!")
+
+    if ("baselineUri" in event):
+        baseline_uri = event["baselineUri"]
+    else:
+        raise KeyError("'Baseline Data S3 URI' not found in Lambda event!")
+
+    logger.info(f"Computing Evaluation Metrics from: {transform_output}")
+    try:
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as baseline:
+            metrics = evaluate_transform_output(s3, transform_output, baseline)
+            baseline.flush()
+            report = metrics.report()
+            logger.info(f"Evaluation Report: {report}")
+            s3.upload_file(baseline.name, urlparse(baseline_uri).netloc, urlparse(baseline_uri).path.lstrip("/"))
+        s3.put_object(
+            Bucket=os.environ["BUCKET"],
+            Key=evaluation_file,
+            Body=json.dumps(report).encode("utf-8")
+        )
+    except ClientError as e:
+        error_message = e.response["Error"]["Message"]
+        logger.error(error_message)
+        raise Exception(error_message)
+
+    return {
+        "statusCode": 200,
+        "rows": metrics.count,
+        "rmse": report["regression_metrics"]["rmse"]["value"]
+    }
@@ -1,27 +1,27 @@
 import json
 import os
 import pathlib
-import tarfile
+import time
 import pandas as pd
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense
-from tensorflow.keras.optimizers import Adam
-from sklearn import preprocessing
 from sklearn.metrics import mean_squared_error
+from inference import keras_objects, extract_artifacts
+from features import transform, column_names
+
+inference_engine = os.environ.get("INFERENCE_ENGINE", "keras")
 
 
 def load_model(base_dir):
     print("Loading Model")
-    
-    model_path = os.path.join(base_dir, "model/model.tar.gz")
-    with tarfile.open(model_path) as tar:
-        tar.extractall(".")
-    
-    model = tf.keras.models.load_model("model.h5")
-    model.compile(optimizer="adam", loss="mse")
+    started = time.time()
+    model_path = extract_artifacts(os.path.join(base_dir, "model/model.tar.gz"), ["model.h5"])["model.h5"]
+    if inference_engine == "numpy":
+        from inference import NumpyModel
+        model = NumpyModel.load(model_path)
+    else:
+        import tensorflow as tf
+        model = tf.keras.models.load_model(model_path, custom_objects=keras_objects(), compile=False)
+    print(f"Model Load Time: {time.time() - started:.3f}s")
     return model
 
 
@@ -44,24 +44,10 @@ def evaluate_model(base_dir, model):
     print("Evaluating Model")
     truths = []
     predictions = []
-    column_names = [
-        "rings",
-        "length", 
-        "diameter",
-        "height",
-        "whole_weight",
-        "shucked_weight",
-        "viscera_weight",
-        "shell_weight",
-        "sex_F",
-        "sex_I",
-        "sex_M"
-    ]
     data_path = os.path.join(base_dir, "data/testing.csv")
-    data = pd.read_csv(data_path, names=column_names)
+    data = pd.read_csv(data_path, names=column_names())
     y = data["rings"].to_numpy()
-    X = data.drop(["rings"], axis=1).to_numpy()
-    X = preprocessing.normalize(X)
+    X = transform(data.drop(["rings"], axis=1))
     for row in range(len(X)):
         payload = [X[row].tolist()]
         result = model.predict(payload)
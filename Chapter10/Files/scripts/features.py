@@ -0,0 +1,109 @@
+import json
+import os
+import numpy as np
+
+
+schema = {
+    "version": 1,
+    "label": "rings",
+    "measurements": ["length", "diameter", "height", "whole_weight", "shucked_weight", "viscera_weight", "shell_weight"],
+    "categories": {"sex": ["F", "I", "M"]},
+    "normalization": "l2"
+}
+schema_file = "features.json"
+
+
+def one_hot_names(schema=schema):
+    return [f"{name}_{category}" for name, categories in schema["categories"].items() for category in categories]
+
+
+def column_names(schema=schema, one_hot=True, label=True):
+    names = [schema["label"]] if label else []
+    return names + schema["measurements"] + (one_hot_names(schema) if one_hot else list(schema["categories"]))
+
+
+def get_columns(batch):
+    if hasattr(batch, "column_names") and hasattr(batch, "column"):
+        names = batch.column_names
+        data = {name: batch.column(name).to_numpy(zero_copy_only=False) for name in names}
+    elif hasattr(batch, "columns") and hasattr(batch, "to_numpy"):
+        data = {name: batch[name].to_numpy() for name in batch.columns}
+    elif isinstance(batch, np.ndarray) and batch.dtype.names is not None:
+        data = {name: batch[name] for name in batch.dtype.names}
+    elif isinstance(batch, dict):
+        data = {name: np.atleast_1d(np.asarray(values)) for name, values in batch.items()}
+    else:
+        data = {name: np.asarray([record[name] for record in batch]) for name in batch[0]}
+    return {str(name).strip().lower().replace(" ", "_"): values for name, values in data.items()}
+
+
+def encode_category(data, name, categories):
+    if name in data:
+        values = data[name]
+        if values.dtype.kind in "iuf":
+            return values
+        uniques, inverse = np.unique(np.char.upper(values.astype(str)), return_inverse=True)
+        lookup = {category.upper(): index for index, category in enumerate(categories)}
+        unknown = [value for value in uniques if value not in lookup]
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown '{name}' categories: {unknown}")
+        return np.asarray([lookup[value] for value in uniques])[inverse]
+    names = [f"{name}_{category}".lower() for category in categories]
+    if all(column in data for column in names):
+        return np.argmax(np.stack([data[column] for column in names], axis=1), axis=1)
+    raise KeyError(f"'{name}' not found in the feature batch!")
+
+
+def transform(batch, schema=schema):
+    measurements = schema["measurements"]
+    categories = schema["categories"]
+    if isinstance(batch, np.ndarray) and batch.dtype.names is None:
+        batch = np.atleast_2d(batch)
+        if batch.shape[1] == len(measurements) + len(categories) and batch.dtype.kind in "iuf":
+            return batch.astype(np.float32, copy=False)
+        if batch.shape[1] == len(measurements) + len(one_hot_names(schema)):
+            batch = dict(zip(column_names(schema, label=False), batch.T))
+        elif batch.shape[1] == len(measurements) + len(categories):
+            batch = dict(zip(column_names(schema, one_hot=False, label=False), batch.T))
+        else:
+            raise ValueError(f"Expected {len(measurements) + len(categories)} raw or {len(measurements) + len(one_hot_names(schema))} one-hot encoded columns, got {batch.shape[1]}")
+    data = get_columns(batch)
+    rows = len(next(iter(data.values())))
+    output = np.empty((rows, len(measurements) + len(categories)), dtype=np.float32)
+    for index, name in enumerate(measurements):
+        output[:, index] = data[name]
+    for index, (name, values) in enumerate(categories.items()):
+        output[:, len(measurements) + index] = encode_category(data, name, values)
+    return output
+
+
+def one_hot(batch, schema=schema):
+    raw = transform(batch, schema)
+    size = len(schema["measurements"])
+    encoded = [raw[:, :size]]
+    for index, values in enumerate(schema["categories"].values()):
+        encoded.append(np.eye(len(values), dtype=np.float32)[raw[:, size + index].astype(np.int64)])
+    return np.concatenate(encoded, axis=1)
+
+
+def encode(raw, schema=schema):
+    features = one_hot(raw, schema)
+    if schema["normalization"] == "l2":
+        features /= np.sqrt(np.maximum(np.sum(features * features, axis=1, keepdims=True), 1e-12))
+    return features
+
+
+def save_schema(directory, schema=schema):
+    with open(os.path.join(directory, schema_file), "w") as f:
+        json.dump(schema, f)
+
+
+def load_schema(directory):
+    path = os.path.join(directory, schema_file)
+    if not os.path.exists(path):
+        return schema
+    with open(path, "r") as f:
+        saved = json.load(f)
+    if saved["version"] != schema["version"]:
+        raise ValueError(f"Unsupported feature schema version {saved['version']}, expected {schema['version']}")
+    return saved
@@ -15,7 +15,7 @@ from .stacks.data_workflow_stack import DataWorkflowStack
 
 class MLWorkflowStage(cdk.Stage):
     
-    def __init__(self, scope: Construct, id: str, *, group_name: str, threshold: float, data_bucket_name: str, feature_group_name: str, **kwargs):
+    def __init__(self, scope: Construct, id: str, *, group_name: str, threshold: float, data_bucket_name: str, feature_group_name: str, sweep: dict=None, transform: dict=None, training_instances: int=1, input_mode: str='File', use_spot: bool=False, model_name: str=None, **kwargs):
         super().__init__(scope, id, **kwargs)
         ml_workflow_stack = MLWorkflowStack(
             self,
@@ -23,23 +23,29 @@ class MLWorkflowStage(cdk.Stage):
             group_name=group_name,
             threshold=threshold,
             data_bucket_name=data_bucket_name,
-            feature_group_name=feature_group_name
+            feature_group_name=feature_group_name,
+            sweep=sweep,
+            transform=transform,
+            training_instances=training_instances,
+            input_mode=input_mode,
+            use_spot=use_spot,
+            model_name=model_name
         )
         self.sfn_arn = ml_workflow_stack.sfn_output
 
 class TestApplicationStage(cdk.Stage):
 
-    def __init__(self, scope: Construct, id: str, *, model_name: str, **kwargs):
+    def __init__(self, scope: Construct, id: str, *, model_name: str, inference_mode: str='endpoint', **kwargs):
         super().__init__(scope, id, **kwargs)
-        test_stack = TestApplicaitonStack(self, "TestApplicaitonStack", model_name=model_name)
+        test_stack = TestApplicaitonStack(self, "TestApplicaitonStack", model_name=model_name, inference_mode=inference_mode)
         self.cdn_output = test_stack.cdn_output
         self.api_output = test_stack.api_output
 
 
 class ProductionApplicationStage(cdk.Stage):
-    def __init__(self, scope: Construct, id: str, *, model_name: str, **kwargs):
+    def __init__(self, scope: Construct, id: str, *, model_name: str, inference_mode: str='endpoint', **kwargs):
         super().__init__(scope, id, **kwargs)
-        production_stack = ProductionApplicaitonStack(self, "ProdApplicationStack", model_name=model_name)
+        production_stack = ProductionApplicaitonStack(self, "ProdApplicationStack", model_name=model_name, inference_mode=inference_mode)
         self.cdn_output = production_stack.cdn_output
         self.api_output = production_stack.api_output
 
@@ -52,7 +58,7 @@ class DataWorkflowStage(cdk.Stage):
 
 class PipelineStack(cdk.Stack):
 
-    def __init__(self, scope: Construct, id: str, *, model_name: str=None, group_name: str=None, repo_name: str=None, feature_group: str=None, threshold: float=None, cdk_version: str=None, **kwargs) -> None:
+    def __init__(self, scope: Construct, id: str, *, model_name: str=None, group_name: str=None, repo_name: str=None, feature_group: str=None, threshold: float=None, cdk_version: str=None, sweep: dict=None, transform: dict=None, training_instances: int=1, input_mode: str='File', use_spot: bool=False, inference_mode: str='endpoint', **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
         self.code_repo = codecommit.Repository(
@@ -105,19 +111,27 @@ class PipelineStack(cdk.Stack):
             data_bucket_name=self.data_bucket.bucket_name,
             group_name=group_name,
             threshold=threshold,
-            feature_group_name=feature_group
+            feature_group_name=feature_group,
+            sweep=sweep,
+            transform=transform,
+            training_instances=training_instances,
+            input_mode=input_mode,
+            use_spot=use_spot,
+            model_name=model_name
         )
 
         test_stage = TestApplicationStage(
             self,
             "Test-Deployment",
-            model_name=model_name
+            model_name=model_name,
+            inference_mode=inference_mode
         )
 
         prod_stage = ProductionApplicationStage(
             self,
             "Production-Deployment",
-            model_name=model_name
+            model_name=model_name,
+            inference_mode=inference_mode
         )
 
         data_workflow_stage = DataWorkflowStage(
@@ -142,6 +156,8 @@ class PipelineStack(cdk.Stack):
                     f"npm install -g aws-cdk@{cdk_version}",
                     "python -m pip install --upgrade pip",
                     "pip install -r requirements.txt",
+                    "pip install -r ./tests/requirements.txt",
+                    "pytest ./tests/unit_tests.py",
                     "cdk synth"
                 ]
             )
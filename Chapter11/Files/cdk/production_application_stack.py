@@ -15,7 +15,7 @@ from constructs import Construct
 
 class ProductionApplicaitonStack(cdk.Stack):
 
-    def __init__(self, scope: Construct, id: str, *, model_name: str=None, **kwargs) -> None:
+    def __init__(self, scope: Construct, id: str, *, model_name: str=None, inference_mode: str="endpoint", **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
         endpoint_name = f"{model_name}-prod-endpoint"
@@ -196,7 +196,9 @@ class ProductionApplicaitonStack(cdk.Stack):
                 )
             ),
             environment={
-                "sagemakerEndpoint": endpoint.attr_endpoint_name
+                "sagemakerEndpoint": endpoint.attr_endpoint_name,
+                "inferenceMode": inference_mode,
+                "packageParameter": "ModelPackageName"
             },
             memory_size=512,
             timeout=cdk.Duration.seconds(120)
@@ -204,7 +206,10 @@ class ProductionApplicaitonStack(cdk.Stack):
         form_lambda.add_to_role_policy(
             iam.PolicyStatement(
                 actions=[
-                    "sagemaker:InvokeEndpoint"
+                    "sagemaker:InvokeEndpoint",
+                    "sagemaker:DescribeModelPackage",
+                    "ssm:GetParameter",
+                    "s3:GetObject"
                 ],
                 effect=iam.Effect.ALLOW,
                 resources=["*"]
@@ -14,7 +14,7 @@ from constructs import Construct
 
 class TestApplicaitonStack(cdk.Stack):
 
-    def __init__(self, scope: Construct, id: str, *, model_name: str=None, **kwargs) -> None:
+    def __init__(self, scope: Construct, id: str, *, model_name: str=None, inference_mode: str="endpoint", **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
         endpoint_name = f"{model_name}-test-endpoint"
@@ -111,7 +111,9 @@ class TestApplicaitonStack(cdk.Stack):
                 )
             ),
             environment={
-                "sagemakerEndpoint": endpoint.attr_endpoint_name
+                "sagemakerEndpoint": endpoint.attr_endpoint_name,
+                "inferenceMode": inference_mode,
+                "packageParameter": "ModelPackageName"
             },
             memory_size=512,
             timeout=cdk.Duration.seconds(120)
@@ -119,7 +121,10 @@ class TestApplicaitonStack(cdk.Stack):
         form_lambda.add_to_role_policy(
             iam.PolicyStatement(
                 actions=[
-                    "sagemaker:InvokeEndpoint"
+                    "sagemaker:InvokeEndpoint",
+                    "sagemaker:DescribeModelPackage",
+                    "ssm:GetParameter",
+                    "s3:GetObject"
                 ],
                 effect=iam.Effect.ALLOW,
                 resources=["*"]
@@ -1,16 +1,23 @@
 import os
+import time
 import logging
 import json
+import hashlib
 import boto3
 from botocore.exceptions import ClientError
 from http import HTTPStatus
-import numpy as np
-import pandas as pd
-from sklearn.preprocessing import normalize
+from urllib.parse import urlparse
+from inference import NumpyModel, extract_artifacts
+from features import transform
 
 sm = boto3.client("sagemaker-runtime")
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
+inference_mode = os.environ.get("inferenceMode", "endpoint")
+package_ttl = int(os.environ.get("packageRefreshSeconds", 300))
+cache_dir = "/tmp/models"
+local_model = {"package": None, "model": None, "checked": 0}
+aliases = {"wholew_weight": "whole_weight"}
 
 def lambda_handler(request, context):
     logger.info(f"Processing HTTP API Request: {json.dumps(request, indent=2)}")
@@ -56,35 +63,26 @@ def handle_contact(request):
 
 
 def handle_predict(request):
-    df = pd.json_normalize(json.loads(request["body"]))
-    logger.info(f"Received Request Body: {df}")
-    s_pre = df["sex"][0]
-    s_post = handle_encoding(s_pre)
-    x = df.drop(columns=["sex"], axis=1)
-    x_pre = x.to_numpy()
-    x_post = normalize(x_pre).tolist()[0]
-    payload = ",".join(map(str, x_post+s_post))
+    try:
+        body = json.loads(request.get("body") or "")
+        logger.info(f"Received Request Body: {body}")
+        features = transform([{aliases.get(name, name): value for name, value in body.items()}])
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        logger.error(f"Invalid Prediction Request: {e}")
+        return HTTPStatus.BAD_REQUEST, json.dumps(
+            {
+                "message": "<b>Invalid Request!</b> Please provide all of the Abalone measurements."
+            }
+        )
+    payload = ",".join(features[0].astype(str))
     logger.info(f"SageMaker Request Payload: {payload}")
     try:
-        if ("inference-id" in request["headers"]):
-            inference_id = request["headers"]["inference-id"]
-            logger.info(f"Invoking SageMaker Endpoint with Ground Truth Inference ID: {inference_id}")
-            response = sm.invoke_endpoint(
-                EndpointName=os.environ["sagemakerEndpoint"],
-                ContentType="text/csv",
-                Body=payload,
-                InferenceId=inference_id
-            )
-        else:
-            logger.info("Invoking SageMaker Enspoint with no Ground Truth Inference ID")
-            response = sm.invoke_endpoint(
-                EndpointName=os.environ["sagemakerEndpoint"],
-                ContentType="text/csv",
-                Body=payload
-            )
-        logger.debug(f"Sagemaker Response: {response}")
-        prediction = response["Body"].read().decode("utf-8").split(".")[0]
-        logger.info(f"SageMaker Endpoint Prediction: {prediction}")
+        prediction = None
+        if inference_mode == "local" and "inference-id" not in request["headers"]:
+            prediction = handle_local_predict(features)
+        if prediction is None:
+            prediction = handle_endpoint_predict(request, payload)
+        prediction = prediction.split(".")[0]
         logger.debug(type(prediction))
         rings = round(int(prediction))
         age = rings + 1.5
@@ -104,10 +102,63 @@ def handle_predict(request):
         )
 
 
-def handle_encoding(sex):
-    if sex == "M" or sex == "m":
-        return [0., 0., 1.0]
-    elif sex == "F" or sex == "f":
-        return [1.0, 0., 0.]
-    elif sex == "I" or sex == "i":
-        return [0., 1.0, 0.]
+def handle_local_predict(features):
+    try:
+        prediction = f"{get_local_model().predict(features)[0][0]:f}"
+        logger.info(f"Local Model Prediction: {prediction}")
+        return prediction
+    except Exception as e:
+        logger.error(f"Local inference failed, falling back to the SageMaker Endpoint: {e}")
+        return None
+
+
+def handle_endpoint_predict(request, payload):
+    if ("inference-id" in request["headers"]):
+        inference_id = request["headers"]["inference-id"]
+        logger.info(f"Invoking SageMaker Endpoint with Ground Truth Inference ID: {inference_id}")
+        response = sm.invoke_endpoint(
+            EndpointName=os.environ["sagemakerEndpoint"],
+            ContentType="text/csv",
+            Body=payload,
+            InferenceId=inference_id
+        )
+    else:
+        logger.info("Invoking SageMaker Enspoint with no Ground Truth Inference ID")
+        response = sm.invoke_endpoint(
+            EndpointName=os.environ["sagemakerEndpoint"],
+            ContentType="text/csv",
+            Body=payload
+        )
+    logger.debug(f"Sagemaker Response: {response}")
+    prediction = response["Body"].read().decode("utf-8")
+    logger.info(f"SageMaker Endpoint Prediction: {prediction}")
+    return prediction
+
+
+def get_local_model(ssm=None, sagemaker=None, s3=None):
+    if local_model["model"] is not None and time.time() - local_model["checked"] < package_ttl:
+        return local_model["model"]
+    ssm = ssm or boto3.client("ssm")
+    package = ssm.get_parameter(Name=os.environ["packageParameter"])["Parameter"]["Value"]
+    local_model["checked"] = time.time()
+    if package != local_model["package"]:
+        logger.info(f"Loading Model Package for local inference: {package}")
+        local_model["model"] = NumpyModel.load(fetch_weights(package, sagemaker=sagemaker, s3=s3))
+        local_model["package"] = package
+    return local_model["model"]
+
+
+def fetch_weights(package, sagemaker=None, s3=None):
+    directory = os.path.join(cache_dir, hashlib.sha256(package.encode("utf-8")).hexdigest())
+    archive = os.path.join(directory, "model.tar.gz")
+    if not os.path.exists(archive):
+        sagemaker = sagemaker or boto3.client("sagemaker")
+        s3 = s3 or boto3.client("s3")
+        model_uri = sagemaker.describe_model_package(
+            ModelPackageName=package
+        )["InferenceSpecification"]["Containers"][0]["ModelDataUrl"]
+        logger.info(f"Downloading model weights from: {model_uri}")
+        os.makedirs(directory, exist_ok=True)
+        s3.download_file(urlparse(model_uri).netloc, urlparse(model_uri).path.lstrip("/"), f"{archive}.tmp")
+        os.replace(f"{archive}.tmp", archive)
+    return extract_artifacts(archive, ["model.h5"], cache_dir=directory)["model.h5"]
@@ -0,0 +1,161 @@
+import os
+import json
+import hashlib
+import shutil
+import tarfile
+import threading
+import h5py
+import numpy as np
+from features import encode, schema
+
+
+activations = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+    "tanh": np.tanh
+}
+custom_objects = {}
+artifact_cache = os.environ.get("ARTIFACT_CACHE_DIR", "/tmp/artifacts")
+
+
+def decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def keras_objects():
+    if len(custom_objects) > 0:
+        return custom_objects
+    import tensorflow as tf
+
+    class RawFeatures(tf.keras.layers.Layer):
+
+        def __init__(self, categories=len(schema["categories"]["sex"]), **kwargs):
+            super().__init__(**kwargs)
+            self.categories = categories
+
+        def call(self, inputs):
+            encoded = tf.one_hot(tf.cast(inputs[:, -1], tf.int32), self.categories)
+            return tf.math.l2_normalize(tf.concat([inputs[:, :-1], encoded], axis=1), axis=1)
+
+        def get_config(self):
+            return dict(super().get_config(), categories=self.categories)
+
+    custom_objects["RawFeatures"] = RawFeatures
+    return custom_objects
+
+
+class NumpyModel(object):
+
+    def __init__(self, layers, categories=None):
+        self.layers = layers
+        self.categories = categories
+
+    @classmethod
+    def load(cls, path):
+        layers = []
+        categories = None
+        with h5py.File(path, "r") as f:
+            config = json.loads(decode(f.attrs["model_config"]))
+            weights = f["model_weights"] if "model_weights" in f else f
+            for layer in config["config"]["layers"]:
+                if layer["class_name"] == "InputLayer":
+                    continue
+                if layer["class_name"] == "RawFeatures":
+                    categories = layer["config"]["categories"]
+                    continue
+                if layer["class_name"] != "Dense":
+                    raise ValueError(f"Unsupported layer type: {layer['class_name']}")
+                if layer["config"]["activation"] not in activations:
+                    raise ValueError(f"Unsupported activation: {layer['config']['activation']}")
+                group = weights[layer["config"]["name"]]
+                names = [decode(name) for name in group.attrs["weight_names"]]
+                kernel = np.asarray(group[[name for name in names if "kernel" in name][0]], dtype=np.float32)
+                bias = [np.asarray(group[name], dtype=np.float32) for name in names if "bias" in name]
+                layers.append((kernel, bias[0] if bias else None, activations[layer["config"]["activation"]]))
+        return cls(layers, categories)
+
+    @property
+    def input_size(self):
+        if self.categories is not None:
+            return self.layers[0][0].shape[0] - self.categories + 1
+        return self.layers[0][0].shape[0]
+
+    @property
+    def nbytes(self):
+        return sum(kernel.nbytes + (bias.nbytes if bias is not None else 0) for kernel, bias, _ in self.layers)
+
+    def predict(self, data):
+        outputs = np.asarray(data, dtype=np.float32)
+        if outputs.ndim == 1:
+            outputs = outputs.reshape(1, -1)
+        if self.categories is not None:
+            outputs = encode(outputs)
+        for kernel, bias, activation in self.layers:
+            outputs = outputs @ kernel
+            if bias is not None:
+                outputs += bias
+            outputs = activation(outputs)
+        return outputs
+
+
+class TFLiteModel(object):
+
+    def __init__(self, interpreter, nbytes=0):
+        self.interpreter = interpreter
+        self.nbytes = nbytes
+        self.input_index = interpreter.get_input_details()[0]["index"]
+        self.output_index = interpreter.get_output_details()[0]["index"]
+        self.input_size = int(interpreter.get_input_details()[0]["shape"][-1])
+        self.shape = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        return cls(Interpreter(model_path=path), os.path.getsize(path))
+
+    def predict(self, data):
+        inputs = np.asarray(data, dtype=np.float32)
+        if inputs.ndim == 1:
+            inputs = inputs.reshape(1, -1)
+        with self.lock:
+            if inputs.shape != self.shape:
+                self.interpreter.resize_tensor_input(self.input_index, inputs.shape)
+                self.interpreter.allocate_tensors()
+                self.shape = inputs.shape
+            self.interpreter.set_tensor(self.input_index, inputs)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
+
+
+def extract_artifacts(archive, members, cache_dir=artifact_cache):
+    digest = hashlib.sha256()
+    with open(archive, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    directory = os.path.join(cache_dir, digest.hexdigest()[:32])
+    paths = {member: os.path.join(directory, member) for member in members}
+    missing = {member for member, path in paths.items() if not os.path.exists(path)}
+    if len(missing) == 0:
+        print(f"Using cached model artifacts: {directory}")
+        return paths
+    os.makedirs(directory, exist_ok=True)
+    with tarfile.open(archive, "r|*") as tar:
+        for info in tar:
+            name = os.path.normpath(info.name)
+            if name not in missing or not info.isfile():
+                continue
+            with tar.extractfile(info) as source, open(f"{paths[name]}.tmp", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.replace(f"{paths[name]}.tmp", paths[name])
+            missing.remove(name)
+            if len(missing) == 0:
+                break
+    if len(missing) > 0:
+        raise KeyError(f"{sorted(missing)} not found in {archive}")
+    return paths
@@ -3,36 +3,119 @@ import os
 import json
 import time
 import sys
+import asyncio
 import logging
 
 sfn = boto3.client("stepfunctions")
 logger = logging.getLogger()
 log_format = "%(levelname)s: [%(filename)s:%(lineno)s] %(message)s"
 logging.basicConfig(format=log_format, level=os.environ.get("LOGLEVEL", "INFO").upper())
-logger.info(f'Invoking ML Workflow: {os.environ["STATEMACHINE_ARN"]}')
-execution_arn = sfn.start_execution(
-    stateMachineArn=os.environ['STATEMACHINE_ARN'],
-    input=json.dumps(
+min_interval = float(os.environ.get("POLL_MIN_INTERVAL", 5))
+max_interval = float(os.environ.get("POLL_MAX_INTERVAL", 60))
+backoff_rate = float(os.environ.get("POLL_BACKOFF_RATE", 1.5))
+
+
+class WorkflowFailed(Exception):
+    pass
+
+
+def get_inputs():
+    model_names = []
+    for name in (os.environ.get("MODEL_NAMES") or os.environ["MODEL_NAME"]).split(","):
+        if name.strip() in model_names:
+            logger.warning(f"Ignoring duplicate model name: {name.strip()}")
+        elif name.strip():
+            model_names.append(name.strip())
+    return [
         {
             "input": {
-                "model_name": os.environ["MODEL_NAME"],
+                "model_name": name,
                 "pipeline_name": os.environ["PIPELINE_NAME"],
                 "stage_name": os.environ["STAGE_NAME"],
                 "action_name": os.environ["ACTION_NAME"],
                 "data_bucket": os.environ["DATA_BUCKET"]
             }
-        }
-    )
-)["executionArn"]
-status = sfn.describe_execution(executionArn=execution_arn)["status"]
-while status == "RUNNING":
-    time.sleep(60)
-    logger.info("ML Workflow Status: {}".format(status))
-    status = sfn.describe_execution(executionArn=execution_arn)["status"]
-if status == "SUCCEEDED":
-    logger.info("ML Workflow Exection: {}".format(status))
-    sys.exit(0)
-else:
-    error_message = "ML Workflow execution: {}".format(status)
-    logger.error(error_message)
-    sys.exit(255)
+        } for name in model_names
+    ]
+
+
+async def call(func, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(None, lambda: func(**kwargs))
+
+
+async def run_execution(client, state_machine_arn, execution_input, semaphore, timings):
+    name = execution_input["input"]["model_name"]
+    async with semaphore:
+        start = time.time()
+        starting = asyncio.ensure_future(call(client.start_execution, stateMachineArn=state_machine_arn, input=json.dumps(execution_input)))
+        try:
+            execution_arn = (await asyncio.shield(starting))["executionArn"]
+        except asyncio.CancelledError:
+            execution_arn = (await starting)["executionArn"]
+            timings[name] = {"arn": execution_arn, "start": start, "status": "RUNNING", "polls": 0}
+            raise
+        timings[name] = {"arn": execution_arn, "start": start, "status": "RUNNING", "polls": 0}
+        logger.info(f"Started ML Workflow for {name}: {execution_arn}")
+        interval = min_interval
+        while True:
+            status = (await call(client.describe_execution, executionArn=execution_arn))["status"]
+            timings[name]["polls"] += 1
+            timings[name]["status"] = status
+            if status != "RUNNING":
+                break
+            logger.info(f"ML Workflow Status ({name}): {status}")
+            await asyncio.sleep(interval)
+            interval = min(interval * backoff_rate, max_interval)
+        timings[name]["end"] = time.time()
+        if status != "SUCCEEDED":
+            raise WorkflowFailed(f"ML Workflow execution ({name}): {status}")
+        logger.info(f"ML Workflow Execution ({name}): {status}")
+        return execution_arn
+
+
+async def run_executions(client, state_machine_arn, inputs, max_concurrency, timings):
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = [asyncio.ensure_future(run_execution(client, state_machine_arn, i, semaphore, timings)) for i in inputs]
+    try:
+        return await asyncio.gather(*tasks)
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for name, timing in timings.items():
+            if timing["status"] == "RUNNING":
+                logger.info(f"Stopping ML Workflow for {name}: {timing['arn']}")
+                await call(client.stop_execution, executionArn=timing["arn"], cause="Another ML Workflow execution failed")
+                timing["status"] = "ABORTED"
+                timing["end"] = time.time()
+        raise
+
+
+def print_timings(timings):
+    print(f"{'Model':<24}{'Status':<12}{'Polls':>6}{'Duration (s)':>14}")
+    for name, timing in timings.items():
+        duration = timing.get("end", time.time()) - timing["start"]
+        print(f"{name:<24}{timing['status']:<12}{timing['polls']:>6}{duration:>14.1f}")
+
+
+def main(client=sfn):
+    state_machine_arn = os.environ["STATEMACHINE_ARN"]
+    inputs = get_inputs()
+    max_concurrency = int(os.environ.get("MAX_CONCURRENCY", len(inputs)))
+    if len(inputs) == 0 or max_concurrency < 1:
+        logger.error(f"Invalid ML Workflow invocation: {len(inputs)} model names, MAX_CONCURRENCY={max_concurrency}")
+        return 255
+    logger.info(f"Invoking ML Workflow: {state_machine_arn} ({len(inputs)} executions, max concurrency {max_concurrency})")
+    timings = {}
+    try:
+        asyncio.run(run_executions(client, state_machine_arn, inputs, max_concurrency, timings))
+    except WorkflowFailed as e:
+        logger.error(str(e))
+        return 255
+    finally:
+        print_timings(timings)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -30,4 +30,4 @@ def test_errors():
         assert response.status_code == 404
         assert json.loads(response.content)["message"] == "Not Found"
     with requests.post(os.environ["API_URL"]+"api/predict") as response:
-        assert response.status_code == 500
+        assert response.status_code == 400
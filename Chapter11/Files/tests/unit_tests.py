@@ -0,0 +1,402 @@
+import os
+import re
+import sys
+import json
+import time
+import tarfile
+import threading
+import importlib.util
+import h5py
+import numpy as np
+import pytest
+from botocore.exceptions import ClientError
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../lambda/formHandler"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../scripts"))
+import index
+import invoke
+
+repo_root = os.path.join(os.path.dirname(__file__), "../../..")
+shared_modules = {
+    "Chapter10/Files/scripts/features.py": [
+        "Chapter05/Notebook/Abalone CICD Example.ipynb",
+        "Chapter08/airflow/scripts/features.py",
+        "Chapter10/Files/airflow/dags/features.py",
+        "Chapter11/Files/lambda/formHandler/features.py"
+    ],
+    "Chapter10/Files/scripts/inference.py": [
+        "Chapter05/Notebook/Abalone CICD Example.ipynb",
+        "Chapter08/airflow/scripts/inference.py",
+        "Chapter11/Files/lambda/formHandler/inference.py"
+    ],
+    "Chapter09/Files/airflow/dags/dag_config.py": [
+        "Chapter10/Files/airflow/dags/dag_config.py"
+    ],
+    "Chapter10/Files/lambda/transformMetrics/metrics.py": [
+        "Chapter04/scripts/metrics.py"
+    ]
+}
+registry_paths = [
+    os.path.join(os.path.dirname(__file__), "../lambda/registryCreator/index.py"),
+    os.path.join(os.path.dirname(__file__), "../../../Chapter10/Files/lambda/registryCreator/index.py")
+]
+form_paths = [
+    os.path.join(os.path.dirname(__file__), "../www/index.html"),
+    os.path.join(os.path.dirname(__file__), "../../../Chapter10/www/index.html")
+]
+form_values = {
+    "length": "0.455",
+    "diameter": "0.365",
+    "height": "0.095",
+    "whole_weight": "0.514",
+    "shucked_weight": "0.2245",
+    "viscera_weight": "0.101",
+    "shell_weight": "0.15",
+    "sex": "M"
+}
+
+
+def predict_request(body):
+    return {
+        "requestContext": {"http": {"method": "POST"}},
+        "rawPath": "/api/predict",
+        "isBase64Encoded": False,
+        "headers": {},
+        "body": body
+    }
+
+
+def form_payload():
+    paths = [path for path in form_paths if os.path.exists(path)]
+    if len(paths) == 0:
+        pytest.skip("www/index.html not found")
+    with open(paths[0], "r") as f:
+        script = f.read().split("function submitPredictForm()")[1]
+    fields = re.search(r"var data = \{(.*?)\};", script, re.S).group(1)
+    return {key: form_values[key] if key in form_values else "" for key in re.findall(r'"(\w+)"\s*:', fields)}
+
+
+def invoke_endpoint(**kwargs):
+    class Body(object):
+        def read(self):
+            return b"10.3"
+    invoke_endpoint.payload = kwargs["Body"]
+    return {"Body": Body()}
+
+
+def test_predict_form_payload(monkeypatch):
+    monkeypatch.setenv("sagemakerEndpoint", "abalone-endpoint")
+    monkeypatch.setattr(index.sm, "invoke_endpoint", invoke_endpoint)
+    payload = form_payload()
+    assert set(payload) == set(form_values)
+    response = index.lambda_handler(predict_request(json.dumps(payload)), None)
+    assert response["statusCode"] == 200
+    assert "<b>10</b> rings" in json.loads(response["body"])["message"]
+    assert invoke_endpoint.payload == "0.455,0.365,0.095,0.514,0.2245,0.101,0.15,2.0"
+
+
+def test_predict_legacy_form_payload(monkeypatch):
+    monkeypatch.setenv("sagemakerEndpoint", "abalone-endpoint")
+    monkeypatch.setattr(index.sm, "invoke_endpoint", invoke_endpoint)
+    payload = dict(form_values)
+    payload["wholew_weight"] = payload.pop("whole_weight")
+    response = index.lambda_handler(predict_request(json.dumps(payload)), None)
+    assert response["statusCode"] == 200
+
+
+@pytest.mark.parametrize("body", [
+    None,
+    "",
+    "not json",
+    "[]",
+    json.dumps({name: value for name, value in form_values.items() if name != "height"}),
+    json.dumps(dict(form_values, length="")),
+    json.dumps(dict(form_values, sex="X"))
+])
+def test_predict_invalid_request(body):
+    response = index.lambda_handler(predict_request(body), None)
+    assert response["statusCode"] == 400
+    assert "Invalid Request" in json.loads(response["body"])["message"]
+
+
+class StubSSM(object):
+    def __init__(self, package):
+        self.package = package
+
+    def get_parameter(self, Name):
+        return {"Parameter": {"Name": Name, "Value": self.package}}
+
+
+class StubSageMaker(object):
+    def describe_model_package(self, ModelPackageName):
+        version = ModelPackageName.split("/")[-1]
+        return {"InferenceSpecification": {"Containers": [{"ModelDataUrl": f"s3://model-bucket/{version}/output/model.tar.gz"}]}}
+
+
+class StubS3(object):
+    def __init__(self, archives):
+        self.archives = archives
+        self.downloads = []
+
+    def download_file(self, bucket, key, filename):
+        self.downloads.append(f"s3://{bucket}/{key}")
+        with open(self.archives[key.split("/")[0]], "rb") as source, open(filename, "wb") as target:
+            target.write(source.read())
+
+
+def write_model(directory, kernel, member):
+    path = os.path.join(directory, "model.h5")
+    with h5py.File(path, "w") as f:
+        f.attrs["model_config"] = json.dumps({"config": {"layers": [{"class_name": "Dense", "config": {"name": "dense", "activation": "linear"}}]}})
+        group = f.create_group("model_weights/dense")
+        group.attrs["weight_names"] = [b"dense/kernel:0", b"dense/bias:0"]
+        group["dense/kernel:0"] = np.asarray(kernel, dtype=np.float32).reshape(-1, 1)
+        group["dense/bias:0"] = np.zeros(1, dtype=np.float32)
+    archive = os.path.join(directory, f"{os.path.basename(directory)}.tar.gz")
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(path, arcname=member)
+    return archive
+
+
+def test_fetch_weights(monkeypatch, tmp_path):
+    archives = {}
+    for version, kernel, member in [("1", [1.0, 2.0], "./model.h5"), ("2", [3.0, 4.0], "model.h5")]:
+        directory = tmp_path / f"v{version}"
+        directory.mkdir()
+        archives[version] = write_model(str(directory), kernel, member)
+    monkeypatch.setenv("packageParameter", "ModelPackageName")
+    monkeypatch.setattr(index, "cache_dir", str(tmp_path / "models"))
+    monkeypatch.setattr(index, "local_model", {"package": None, "model": None, "checked": 0})
+    monkeypatch.setattr(index, "package_ttl", 0)
+    ssm = StubSSM("arn:aws:sagemaker:us-east-1:123456789012:model-package/abalone/1")
+    sagemaker = StubSageMaker()
+    s3 = StubS3(archives)
+
+    model = index.get_local_model(ssm, sagemaker, s3)
+    assert model.predict([[1.0, 1.0]])[0][0] == 3.0
+    assert index.get_local_model(ssm, sagemaker, s3) is model
+    assert s3.downloads == ["s3://model-bucket/1/output/model.tar.gz"]
+
+    ssm.package = "arn:aws:sagemaker:us-east-1:123456789012:model-package/abalone/2"
+    assert index.get_local_model(ssm, sagemaker, s3).predict([[1.0, 1.0]])[0][0] == 7.0
+    assert len(s3.downloads) == 2
+
+    monkeypatch.setattr(index, "local_model", {"package": None, "model": None, "checked": 0})
+    assert index.get_local_model(ssm, sagemaker, s3).predict([[1.0, 1.0]])[0][0] == 7.0
+    assert len(s3.downloads) == 2
+
+
+def test_predict_local_mode(monkeypatch):
+    class Model(object):
+        def predict(self, features):
+            return np.asarray([[8.6]])
+    monkeypatch.setattr(index, "inference_mode", "local")
+    monkeypatch.setattr(index, "get_local_model", lambda: Model())
+    monkeypatch.setattr(index.sm, "invoke_endpoint", None)
+    response = index.lambda_handler(predict_request(json.dumps(form_values)), None)
+    assert response["statusCode"] == 200
+    assert "<b>8</b> rings" in json.loads(response["body"])["message"]
+
+
+class FakeStepFunctions(object):
+    def __init__(self, statuses, start_delay=None):
+        self.statuses = statuses
+        self.start_delay = start_delay or {}
+        self.lock = threading.Lock()
+        self.executions = {}
+        self.active = set()
+        self.max_active = 0
+        self.stopped = []
+
+    def start_execution(self, stateMachineArn, input):
+        name = json.loads(input)["input"]["model_name"]
+        time.sleep(self.start_delay.get(name, 0))
+        execution_arn = f"{stateMachineArn.replace(':stateMachine:', ':execution:')}:{name}"
+        with self.lock:
+            self.executions[execution_arn] = list(self.statuses[name])
+            self.active.add(execution_arn)
+            self.max_active = max(self.max_active, len(self.active))
+        return {"executionArn": execution_arn}
+
+    def describe_execution(self, executionArn):
+        with self.lock:
+            statuses = self.executions[executionArn]
+            status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+            if status != "RUNNING":
+                self.active.discard(executionArn)
+            return {"executionArn": executionArn, "status": status}
+
+    def stop_execution(self, executionArn, cause):
+        with self.lock:
+            self.active.discard(executionArn)
+            self.stopped.append(executionArn)
+        return {}
+
+
+@pytest.fixture
+def workflow_env(monkeypatch):
+    for name, value in [("STATEMACHINE_ARN", "arn:aws:states:us-east-1:123456789012:stateMachine:MLWorkflow"), ("PIPELINE_NAME", "ACME-WebApp-Pipeline"), ("STAGE_NAME", "Build-MLWorkflow"), ("ACTION_NAME", "Execute-MLWorkflow"), ("DATA_BUCKET", "data-bucket")]:
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("MODEL_NAME", raising=False)
+    monkeypatch.delenv("MAX_CONCURRENCY", raising=False)
+    monkeypatch.setattr(invoke, "min_interval", 0.01)
+    monkeypatch.setattr(invoke, "max_interval", 0.01)
+    return monkeypatch
+
+
+def test_invoke_model_names(workflow_env):
+    workflow_env.setenv("MODEL_NAMES", "abalone, urchin,abalone,,")
+    assert [item["input"]["model_name"] for item in invoke.get_inputs()] == ["abalone", "urchin"]
+    workflow_env.setenv("MODEL_NAMES", "")
+    workflow_env.setenv("MODEL_NAME", "abalone")
+    assert [item["input"]["model_name"] for item in invoke.get_inputs()] == ["abalone"]
+
+
+def test_invoke_max_concurrency(workflow_env):
+    names = ["abalone", "urchin", "oyster", "mussel"]
+    workflow_env.setenv("MODEL_NAMES", ",".join(names))
+    workflow_env.setenv("MAX_CONCURRENCY", "2")
+    client = FakeStepFunctions({name: ["RUNNING", "RUNNING", "SUCCEEDED"] for name in names})
+    assert invoke.main(client) == 0
+    assert len(client.executions) == 4
+    assert client.max_active == 2
+    assert client.stopped == []
+
+
+def test_invoke_failure_stops_running_executions(workflow_env):
+    workflow_env.setenv("MODEL_NAMES", "abalone,urchin,oyster")
+    client = FakeStepFunctions({"abalone": ["RUNNING", "FAILED"], "urchin": ["RUNNING"], "oyster": ["RUNNING"]})
+    assert invoke.main(client) == 255
+    assert sorted(arn.split(":")[-1] for arn in client.stopped) == ["oyster", "urchin"]
+    assert client.active == set()
+
+
+def test_invoke_stops_execution_started_during_cancellation(workflow_env):
+    workflow_env.setenv("MODEL_NAMES", "abalone,urchin")
+    client = FakeStepFunctions({"abalone": ["FAILED"], "urchin": ["RUNNING"]}, start_delay={"urchin": 0.5})
+    assert invoke.main(client) == 255
+    assert [arn.split(":")[-1] for arn in client.stopped] == ["urchin"]
+    assert client.active == set()
+
+
+def test_invoke_rejects_invalid_concurrency(workflow_env):
+    workflow_env.setenv("MODEL_NAMES", "abalone")
+    workflow_env.setenv("MAX_CONCURRENCY", "0")
+    client = FakeStepFunctions({"abalone": ["SUCCEEDED"]})
+    assert invoke.main(client) == 255
+    assert client.executions == {}
+
+
+class FakeRegistry(object):
+    def __init__(self, group_name, count, throttles=0, failures=()):
+        self.groups = {group_name: [f"arn:aws:sagemaker:us-east-1:123456789012:model-package/{group_name}/{version}" for version in range(1, count + 1)]}
+        self.throttles = throttles
+        self.failures = failures
+        self.attempts = {}
+        self.pages = 0
+        self.lock = threading.Lock()
+
+    def get_paginator(self, operation_name):
+        assert operation_name == "list_model_packages"
+        return self
+
+    def paginate(self, ModelPackageGroupName, PaginationConfig):
+        offset = 0
+        while True:
+            with self.lock:
+                packages = self.groups[ModelPackageGroupName][offset:offset + PaginationConfig["PageSize"]]
+                self.pages += 1
+            yield {"ModelPackageSummaryList": [{"ModelPackageArn": arn} for arn in packages]}
+            offset += PaginationConfig["PageSize"]
+            if len(packages) < PaginationConfig["PageSize"]:
+                return
+
+    def delete_model_package(self, ModelPackageName):
+        with self.lock:
+            attempt = self.attempts[ModelPackageName] = self.attempts.get(ModelPackageName, 0) + 1
+            if attempt <= self.throttles:
+                raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "DeleteModelPackage")
+            if ModelPackageName.split("/")[-1] in self.failures:
+                raise ClientError({"Error": {"Code": "ConflictException", "Message": f"{ModelPackageName} is in use"}}, "DeleteModelPackage")
+            self.groups[ModelPackageName.split("/")[-2]].remove(ModelPackageName)
+
+    def delete_model_package_group(self, ModelPackageGroupName):
+        with self.lock:
+            assert self.groups[ModelPackageGroupName] == []
+            del self.groups[ModelPackageGroupName]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    paths = [path for path in registry_paths if os.path.exists(path)]
+    if len(paths) == 0:
+        pytest.skip("lambda/registryCreator not found")
+    spec = importlib.util.spec_from_file_location("registry_creator", paths[0])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module.time, "sleep", lambda seconds: None)
+    return module
+
+
+def delete_request(group_name):
+    return {"RequestType": "Delete", "ResourceProperties": {"GroupName": group_name}}
+
+
+def test_registry_delete_pages(monkeypatch, registry):
+    client = FakeRegistry("abalone", 250)
+    monkeypatch.setattr(registry, "sm", client)
+    response = registry.lambda_handler(delete_request("abalone"), None)
+    assert response["PhysicalResourceId"] == "abalone"
+    assert client.groups == {}
+    assert client.pages == 3
+    assert len(client.attempts) == 250
+
+
+def test_registry_delete_retries_throttling(monkeypatch, registry):
+    client = FakeRegistry("abalone", 20, throttles=3)
+    monkeypatch.setattr(registry, "sm", client)
+    registry.lambda_handler(delete_request("abalone"), None)
+    assert client.groups == {}
+    assert set(client.attempts.values()) == {4}
+
+    client = FakeRegistry("abalone", 5, throttles=registry.max_retries + 1)
+    monkeypatch.setattr(registry, "sm", client)
+    with pytest.raises(Exception, match="Rate exceeded"):
+        registry.lambda_handler(delete_request("abalone"), None)
+    assert len(client.groups["abalone"]) == 5
+
+
+def test_registry_delete_partial_failure(monkeypatch, registry):
+    client = FakeRegistry("abalone", 150, failures=("42",))
+    monkeypatch.setattr(registry, "sm", client)
+    with pytest.raises(Exception, match="is in use"):
+        registry.lambda_handler(delete_request("abalone"), None)
+    assert [arn.split("/")[-1] for arn in client.groups["abalone"]] == ["42"]
+
+    client.failures = ()
+    registry.lambda_handler(delete_request("abalone"), None)
+    assert client.groups == {}
+
+
+def read_module(path, name):
+    if not path.endswith(".ipynb"):
+        with open(path, "r") as f:
+            return f.read().rstrip("\n")
+    with open(path, "r") as f:
+        cells = json.load(f)["cells"]
+    for cell in cells:
+        source = "".join(cell["source"])
+        if cell["cell_type"] == "code" and source.startswith(f"%%writefile {name}\n"):
+            return source.split("\n", 1)[1].rstrip("\n")
+    raise AssertionError(f"{path} has no %%writefile {name} cell")
+
+
+@pytest.mark.parametrize("canonical", sorted(shared_modules))
+def test_shared_module_copies(canonical):
+    if not os.path.exists(os.path.join(repo_root, canonical)):
+        pytest.skip(f"{canonical} not found")
+    name = os.path.basename(canonical)
+    expected = read_module(os.path.join(repo_root, canonical), name)
+    for copy in shared_modules[canonical]:
+        assert read_module(os.path.join(repo_root, copy), name) == expected, f"{copy} differs from {canonical}"